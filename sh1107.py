@@ -118,10 +118,841 @@ _SET_VCOM_DSEL_LEVEL     = const(0xDB35) # 16. This command is to set the common
                                          #     POR value 0x35 (0.77 * Vref) 
 _SET_DISPLAY_START_LINE  = const(0xDC00) # 17. Set Display Start Line (double byte command)
 
+_STATE_MARKER            = const(0x71)   # first byte of the settings record made by state()
 
-class SH1107(framebuf.FrameBuffer):
+# helpers comparing the framebuffer with the shadow copy of the display contents,
+# and copying spans of it (native code if the viper emitter is available)
+try:
+    import micropython
+    @micropython.viper
+    def _next_change(a: ptr8, b: ptr8, i: int, end: int) -> int:
+        while i < end and a[i] == b[i]:
+            i += 1
+        return i
+
+    @micropython.viper
+    def _run_end(a: ptr8, b: ptr8, i: int, end: int, gap: int) -> int:
+        last = i
+        while i < end:
+            if a[i] != b[i]:
+                last = i + 1
+            elif i - last + 1 >= gap:
+                break
+            i += 1
+        return last
+
+    @micropython.viper
+    def _copy(dst: ptr8, to: int, src: ptr8, start: int, n: int):
+        i = 0
+        while i < n:
+            dst[to + i] = src[start + i]
+            i += 1
+except:
+    def _next_change(a, b, i, end):
+        # index of the first byte from i that differs, or end
+        while i < end and a[i] == b[i]:
+            i += 1
+        return i
+
+    def _run_end(a, b, i, end, gap):
+        # end of the run of changes starting at i: the run stops at the first
+        # stretch of at least gap unchanged bytes
+        last = i
+        while i < end:
+            if a[i] != b[i]:
+                last = i + 1
+            elif i - last + 1 >= gap:
+                break
+            i += 1
+        return last
+
+    def _copy(dst, to, src, start, n):
+        # copies n bytes of src from start to dst from to (without making a
+        # slice, which would allocate memory)
+        for i in range(n):
+            dst[to + i] = src[start + i]
+
+# helper for scrolling with the display start line: makes byte q of the
+# display RAM lines of each lane from the framebuffer lines moved by s
+try:
+    @micropython.viper
+    def _shift_lines(src: ptr8, dst: ptr8, q: int, s: int, lane: int, lanes: int,
+                     lane_step: int, line_stride: int):
+        t = (8 * q - s) & 127
+        r = t & 7
+        lo = (t >> 3) * line_stride
+        hi = (((t >> 3) + 1) & 15) * line_stride
+        out = q * line_stride
+        i = lane * lane_step
+        end = lanes * lane_step
+        while i < end:
+            dst[i + out] = ((src[i + lo] >> r) | (src[i + hi] << (8 - r))) & 0xFF
+            i += lane_step
+except:
+    def _shift_lines(src, dst, q, s, lane, lanes, lane_step, line_stride):
+        # display RAM lines 8q to 8q + 7 hold framebuffer lines (8q - s) & 127
+        # onwards, which start at bit r of framebuffer byte t >> 3; a lane is a
+        # column (MONO_VLSB) or a row (MONO_HMSB) of the framebuffer
+        t = (8 * q - s) & 127
+        r = t & 7
+        lo = (t >> 3) * line_stride
+        hi = (((t >> 3) + 1) & 15) * line_stride
+        out = q * line_stride
+        for i in range(lane * lane_step, lanes * lane_step, lane_step):
+            dst[i + out] = ((src[i + lo] >> r) | (src[i + hi] << (8 - r))) & 0xFF
+
+
+# helper for drawing bitmaps kept in the framebuffer's layout (font glyphs,
+# sprites): clears (op 0), ORs (op 1) or XORs (op 2) the set bits of a bitmap
+# into a framebuffer. A lane is a column (MONO_VLSB) or a row (MONO_HMSB) and
+# a group the byte of 8 pixels across the lanes; the bitmap's lane 0 and bit 0
+# go to lane lane0 and bit bit0 of the framebuffer, which has d_lanes lanes
+# of d_groups bytes
+try:
+    @micropython.viper
+    def _draw_bits(dst: ptr8, src: ptr8, offset: int, lanes: int, groups: int,
+                   vlsb: int, d_lanes: int, d_groups: int, lane0: int, bit0: int,
+                   op: int):
+        s_lane = 1
+        s_group = lanes
+        d_lane = 1
+        d_group = d_lanes
+        if not vlsb:
+            s_lane = groups
+            s_group = 1
+            d_lane = d_groups
+            d_group = 1
+        shift = bit0 & 7
+        g0 = bit0 >> 3
+        lane = 0
+        while lane < lanes:
+            dl = lane0 + lane
+            if dl >= 0 and dl < d_lanes:
+                g = 0
+                while g < groups:
+                    b = src[offset + lane * s_lane + g * s_group]
+                    if b:
+                        dg = g0 + g
+                        lo = (b << shift) & 0xFF
+                        hi = b >> (8 - shift)
+                        if dg >= 0 and dg < d_groups:
+                            i = dl * d_lane + dg * d_group
+                            if op == 1:
+                                dst[i] = dst[i] | lo
+                            elif op == 2:
+                                dst[i] = dst[i] ^ lo
+                            else:
+                                dst[i] = dst[i] & (lo ^ 0xFF)
+                        if hi and dg + 1 >= 0 and dg + 1 < d_groups:
+                            i = dl * d_lane + (dg + 1) * d_group
+                            if op == 1:
+                                dst[i] = dst[i] | hi
+                            elif op == 2:
+                                dst[i] = dst[i] ^ hi
+                            else:
+                                dst[i] = dst[i] & (hi ^ 0xFF)
+                    g += 1
+            lane += 1
+except:
+    def _draw_bits(dst, src, offset, lanes, groups, vlsb, d_lanes, d_groups,
+                   lane0, bit0, op):
+        if vlsb:
+            (s_lane, s_group, d_lane, d_group) = (1, lanes, 1, d_lanes)
+        else:
+            (s_lane, s_group, d_lane, d_group) = (groups, 1, d_groups, 1)
+        shift = bit0 & 7
+        g0 = bit0 >> 3
+        for lane in range(max(0, -lane0), min(lanes, d_lanes - lane0)):
+            dl = (lane0 + lane) * d_lane
+            for g in range(groups):
+                b = src[offset + lane * s_lane + g * s_group]
+                if b:
+                    # the byte is split over two framebuffer bytes unless the
+                    # bitmap is aligned to 8 pixels
+                    dg = g0 + g
+                    (lo, hi) = ((b << shift) & 0xFF, b >> (8 - shift))
+                    for (i, bits) in ((dg, lo), (dg + 1, hi)):
+                        if bits and 0 <= i < d_groups:
+                            i = dl + i * d_group
+                            if op == 1:
+                                dst[i] |= bits
+                            elif op == 2:
+                                dst[i] ^= bits
+                            else:
+                                dst[i] &= ~bits
+
+class Transport:
+    """
+    the connection used by the SH1107 class to send commands and display
+    data; subclasses implement write_command() and write_data() and may
+    override write_block(), begin() and end() to send updates more efficiently
+    """
+    # number of data bytes that cost about as much to send as one more
+    # address command, unchanged gaps shorter than this are resent when diffing
+    segment_cost = 8
+    # bus transactions used by write_block()
+    block_transactions = 2
+
+    def __init__(self):
+        self.block_command = bytearray(3)
+
+    def write_command(self, buf):
+        raise NotImplementedError
+
+    def write_data(self, buf):
+        raise NotImplementedError
+
+    def write_block(self, page, column, buf):
+        # sets the page and column address and writes buf from there
+        # (along the page in page addressing mode, down the column in vertical addressing mode)
+        command = self.block_command
+        command[0] = _SET_PAGE_ADDRESS | page
+        command[1] = _LOW_COLUMN_ADDRESS | (column & 0x0f)
+        command[2] = _HIGH_COLUMN_ADDRESS | (column >> 4)
+        self.write_command(command)
+        self.write_data(buf)
+
+    def begin(self):
+        # called before and after the data for an update is sent,
+        # for connections that can hold the bus for a whole update
+        pass
+
+    def end(self):
+        pass
+
+
+class I2CTransport(Transport):
+    # each extra segment costs the address and control bytes and the start
+    # and stop conditions of two transactions plus a 3 byte command
+    segment_cost = 10
+
+    def __init__(self, i2c, address=0x3d, combined=False):
+        super().__init__()
+        self.i2c = i2c
+        self.address = address
+        self.combined = combined
+        if combined:
+            self.block_transactions = 1
+        # control byte (Co=1, D/C=0) before each address command byte and a
+        # final control byte (Co=0, D/C=1) marking the rest as display data
+        self.block_header = bytearray(b"\x80\xb0\x80\x00\x80\x10\x40")
+        # buffer vectors for writevto(), reused to avoid allocating a tuple per write
+        self._command_vector = [b"\x00", None]
+        self._data_vector = [b"\x40", None]
+        self._block_vector = [self.block_header, None]
+
+    def write_command(self, command_list):
+        vector = self._command_vector
+        vector[1] = command_list
+        self.i2c.writevto(self.address, vector)
+
+    def write_data(self, buf):
+        vector = self._data_vector
+        vector[1] = buf
+        self.i2c.writevto(self.address, vector)
+
+    def write_block(self, page, column, buf):
+        # with combined set the address command and the data are sent in a single transaction
+        if self.combined:
+            header = self.block_header
+            header[1] = _SET_PAGE_ADDRESS | page
+            header[3] = _LOW_COLUMN_ADDRESS | (column & 0x0f)
+            header[5] = _HIGH_COLUMN_ADDRESS | (column >> 4)
+            vector = self._block_vector
+            vector[1] = buf
+            self.i2c.writevto(self.address, vector)
+        else:
+            super().write_block(page, column, buf)
+
+
+class SPITransport(Transport):
+    # at high clock rates the Python and GPIO overhead of an extra segment
+    # costs much more time than the bytes themselves
+    segment_cost = 32
+
+    def __init__(self, spi, dc, cs=None, burst=False):
+        super().__init__()
+        dc.init(dc.OUT, value=0)
+        if cs is not None:
+            cs.init(cs.OUT, value=1)
+        self.spi = spi
+        self.dc = dc
+        self.cs = cs
+        self.burst = burst
+        self._in_burst = False
+
+    def begin(self):
+        # in burst mode CS is held low for the whole update
+        if self.burst:
+            if self.cs is not None:
+                self.cs(0)
+            self._in_burst = True
+
+    def end(self):
+        if self._in_burst:
+            self._in_burst = False
+            if self.cs is not None:
+                self.cs(1)
 
-    def __init__(self, width, height, external_vcc, delay_ms=200, rotate=0):
+    def write_command(self, cmd):
+        if self.cs is not None:
+            self.cs(1)
+            self.dc(0)
+            self.cs(0)
+            self.spi.write(cmd)
+            self.cs(1)
+        else:
+            self.dc(0)
+            self.spi.write(cmd)
+
+    def write_data(self, buf):
+        if self._in_burst:
+            # CS is held low
+            self.dc(1)
+            self.spi.write(buf)
+        elif self.cs is not None:
+            self.cs(1)
+            self.dc(1)
+            self.cs(0)
+            self.spi.write(buf)
+            self.cs(1)
+        else:
+            self.dc(1)
+            self.spi.write(buf)
+
+    def write_block(self, page, column, buf):
+        # within a burst only DC changes between the address command and the data
+        if self._in_burst:
+            command = self.block_command
+            command[0] = _SET_PAGE_ADDRESS | page
+            command[1] = _LOW_COLUMN_ADDRESS | (column & 0x0f)
+            command[2] = _HIGH_COLUMN_ADDRESS | (column >> 4)
+            self.dc(0)
+            self.spi.write(command)
+            self.dc(1)
+            self.spi.write(buf)
+        else:
+            super().write_block(page, column, buf)
+
+
+class FrameStats:
+    """
+    statistics of the screen updates of a display, kept while enabled with
+    SH1107.frame_stats(): the totals and the last update's pages, bytes,
+    transactions and time, rolling frame times and rates over the last
+    window updates, and how often each page has been sent (heat). Each
+    show() or show_async() call is one frame, however many batches it sends
+    in; updates of viewports or regions are counted in partial, and only
+    in the totals.
+    """
+    def __init__(self, pages, window=32):
+        from array import array
+        self.window = window
+        self.heat = array("L", [0] * pages)
+        self._times = array("L", [0] * window)
+        # ticks_us() start times, which wrap around (at 2**30 on MicroPython)
+        # and are compared with ticks_diff()
+        self._starts = [0] * window
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.partial = 0
+        self.pages = 0
+        self.bytes = 0
+        self.transactions = 0
+        self.last_pages = 0
+        self.last_bytes = 0
+        self.last_transactions = 0
+        self.last_us = 0
+        for page in range(len(self.heat)):
+            self.heat[page] = 0
+        self._bytes_before = 0
+        self._transactions_before = 0
+        self._started = 0
+        self._frame_pages = 0
+        self._frame_us = 0
+
+    def _begin(self):
+        # starts a frame, which the batches sent are added to
+        self._bytes_before = self.bytes
+        self._transactions_before = self.transactions
+        self._frame_pages = 0
+        self._frame_us = 0
+        self._started = time.ticks_us()
+
+    def _add(self, pages_to_update, started):
+        # adds a batch of pages, sent from the ticks_us() time started
+        self._frame_us += time.ticks_diff(time.ticks_us(), started)
+        page = 0
+        while pages_to_update:
+            if pages_to_update & 1:
+                self._frame_pages += 1
+                self.heat[page] += 1
+            pages_to_update >>= 1
+            page += 1
+
+    def _end(self, partial=False):
+        # ends the frame; the time of a frame is the time spent sending its
+        # batches, not the time between them
+        self.pages += self._frame_pages
+        if partial:
+            self.partial += 1
+            return
+        slot = self.frames % self.window
+        self._times[slot] = self._frame_us
+        self._starts[slot] = self._started
+        self.frames += 1
+        self.last_pages = self._frame_pages
+        self.last_bytes = self.bytes - self._bytes_before
+        self.last_transactions = self.transactions - self._transactions_before
+        self.last_us = self._frame_us
+
+    def frame_times(self):
+        """
+        returns the minimum, average, 95th percentile and maximum time in
+        microseconds of the recent updates, or None if there are none
+        """
+        n = min(self.frames, self.window)
+        if not n:
+            return None
+        times = sorted(self._times[:n])
+        return (times[0], sum(times) // n, times[(n * 95 - 1) // 100], times[-1])
+
+    def fps(self):
+        """
+        returns the rate of the recent updates per second, or 0 if there
+        have been fewer than two
+        """
+        n = min(self.frames, self.window)
+        if n < 2:
+            return 0
+        last = (self.frames - 1) % self.window
+        first = (self.frames - n) % self.window
+        elapsed = time.ticks_diff(self._starts[last], self._starts[first])
+        return (n - 1) * 1000000 / elapsed if elapsed else 0
+
+    def summary(self):
+        """
+        returns the statistics as a dict, eg for telemetry
+        """
+        return {"frames": self.frames, "partial": self.partial,
+                "pages": self.pages, "bytes": self.bytes,
+                "transactions": self.transactions, "last_us": self.last_us,
+                "last_bytes": self.last_bytes, "frame_us": self.frame_times(),
+                "fps": self.fps(), "heat": list(self.heat)}
+
+
+class _StatsTransport(Transport):
+    # passes everything on to the display's transport, counting the bytes
+    # and transactions for the statistics
+    def __init__(self, transport, stats):
+        self.transport = transport
+        self.stats = stats
+        self.segment_cost = transport.segment_cost
+
+    def write_command(self, buf):
+        self.stats.transactions += 1
+        self.stats.bytes += len(buf)
+        self.transport.write_command(buf)
+
+    def write_data(self, buf):
+        self.stats.transactions += 1
+        self.stats.bytes += len(buf)
+        self.transport.write_data(buf)
+
+    def write_block(self, page, column, buf):
+        self.stats.transactions += self.transport.block_transactions
+        self.stats.bytes += len(buf) + 3
+        self.transport.write_block(page, column, buf)
+
+    def begin(self):
+        self.transport.begin()
+
+    def end(self):
+        self.transport.end()
+
+
+class _DisplayTransport(Transport):
+    # the transport of a display made without one: a subclass of SH1107 in
+    # the style of the driver before transports, with its own write_command()
+    # and write_data(), which are called for everything sent
+    def __init__(self, display):
+        super().__init__()
+        self.display = display
+        # a segment_cost set by the subclass is kept
+        self.segment_cost = getattr(display, "segment_cost", Transport.segment_cost)
+
+    def write_command(self, buf):
+        self.display.write_command(buf)
+
+    def write_data(self, buf):
+        self.display.write_data(buf)
+
+
+# the large_text() arguments the glyph cache is used for, which
+# tools/emulator.py checks against framebuf2: scales up to _GLYPH_SCALES,
+# colours 0 and 1 and these rotations of the text and of its characters
+_GLYPH_SCALES = 16
+_GLYPH_TURNS = (0, 90, 180, 270)
+
+
+class GlyphCache:
+    """
+    scaled and rotated large_text() glyphs, kept while enabled with
+    SH1107.glyph_cache() up to a limit of max_bytes of glyph buffers; the
+    least recently used glyphs are dropped first. hits and misses count the
+    glyphs found and rendered.
+    """
+    def __init__(self, format, max_bytes=2048):
+        self.format = format
+        self.max_bytes = max_bytes
+        self._glyphs = {}
+        self.clear()
+
+    def clear(self):
+        self._glyphs.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._tick = 0
+
+    def glyph(self, ch, m, c, r, args):
+        # returns the glyph of ch as a FrameBuffer of 8m x 8m pixels, with
+        # its other pixels set to 1 - c (the blit key), or None if it is
+        # larger than the cache
+        key = (ch, m, c, r, args)
+        self._tick += 1
+        entry = self._glyphs.get(key)
+        if entry is not None:
+            self.hits += 1
+            entry[2] = self._tick
+            return entry[0]
+        self.misses += 1
+        size = 8 * m
+        nbytes = size * size // 8
+        if nbytes > self.max_bytes:
+            return None
+        while self.nbytes + nbytes > self.max_bytes:
+            self._drop()
+        buf = bytearray(nbytes)
+        glyph = framebuf.FrameBuffer(buf, size, size, self.format)
+        glyph.fill(1 - c)
+        try:
+            glyph.large_text(ch, 0, 0, m, c, r, *args)
+        except:
+            raise Exception("extended framebuffer v206+ required")
+        self._glyphs[key] = [glyph, nbytes, self._tick]
+        self.nbytes += nbytes
+        return glyph
+
+    def _drop(self):
+        # drops the least recently used glyph
+        oldest = None
+        for key, entry in self._glyphs.items():
+            if oldest is None or entry[2] < oldest[1][2]:
+                oldest = (key, entry)
+        del self._glyphs[oldest[0]]
+        self.nbytes -= oldest[1][1]
+
+
+class DirtyFrameBuffer(framebuf.FrameBuffer):
+    """
+    a FrameBuffer whose drawing methods record the areas they change: the
+    pages (groups of 8 lines) changed and, for each page, the first and last
+    changed column (in the MONO_HMSB layout a byte column, 8 pixels wide).
+    SH1107 sends these areas to the display, and the layers of
+    sh1107_layers.py combine only these areas
+    """
+    def __init__(self, buffer, width, height, format, stride=None):
+        self.width = width
+        self.height = height
+        self.rotate90 = format == framebuf.MONO_VLSB
+        self.pages = (height + 7) // 8
+        self.pages_to_update = 0
+        # first and last changed column of each page to update
+        # (in the MONO_HMSB layout these are byte columns, 8 pixels wide)
+        self.update_start = bytearray(self.pages)
+        self.update_end = bytearray(self.pages)
+        self._glyphs = None
+        if stride is None:
+            super().__init__(buffer, width, height, format)
+        else:
+            super().__init__(buffer, width, height, format, stride)
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return super().pixel(x, y)
+        else:
+            super().pixel(x, y , c)
+            self.register_updates(y, y, x, x)
+
+    def text(self, text, x, y, c=1):
+        super().text(text, x, y, c)
+        self.register_updates(y, y + 7, x, x + 8 * len(text) - 1)
+
+    def line(self, x0, y0, x1, y1, c):
+        super().line(x0, y0, x1, y1, c)
+        self.register_updates(y0, y1, x0, x1)
+
+    def hline(self, x, y, w, c):
+        super().hline(x, y, w, c)
+        self.register_updates(y, y, x, x + w - 1)
+
+    def vline(self, x, y, h, c):
+        super().vline(x, y, h, c)
+        self.register_updates(y, y + h - 1, x, x)
+
+    def fill(self, c):
+        super().fill(c)
+        self.register_updates(0, self.height - 1)
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        super().blit(fbuf, x, y, key, palette)
+        # the size of a FrameBuffer source is not readable, so unless it was
+        # given as a (buffer, width, height, format) tuple or the source has
+        # width and height attributes (eg an SH1107) the update runs to the
+        # right and bottom edges
+        if isinstance(fbuf, tuple):
+            (w, h) = (fbuf[1], fbuf[2])
+        else:
+            w = getattr(fbuf, "width", self.width)
+            h = getattr(fbuf, "height", self.height)
+        self.register_updates(y, y + h - 1, x, x + w - 1)
+
+    def scroll(self, x, y):
+        super().scroll(x, y)
+        # the area the contents are moved to changes (the area uncovered
+        # keeps its pixels)
+        if max(x, 0) < self.width + min(x, 0) and max(y, 0) < self.height + min(y, 0):
+            self.register_updates(max(y, 0), self.height - 1 + min(y, 0),
+                                  max(x, 0), self.width - 1 + min(x, 0))
+
+    # rect() and fill_rect() amended to be compatible with new rect() method
+    # from latest micropython as well as 1.20.0 and previous versions
+    def fill_rect(self, x, y, w, h, c):
+        try:
+            super().fill_rect(x, y, w, h, c)
+        except:
+            super().rect(x, y, w, h, c, f=True)
+        self.register_updates(y, y + h - 1, x, x + w - 1)
+
+    def rect(self, x, y, w, h, c, f=None):
+        if f == None or f == False:
+            super().rect(x, y, w, h, c)
+        else:
+            try:
+                super().rect(x, y, w, h, c, f)
+            except:
+                super().fill_rect(x, y, w, h, c)
+        self.register_updates(y, y + h - 1, x, x + w - 1)
+    
+    def ellipse(self, x, y, xr, yr, c, f=False, m=0xF):
+        super().ellipse(x, y, xr, yr, c, f, m)
+        # only the quadrants drawn: bit 0 for the top right (Q1), then
+        # counter-clockwise to bit 3 for the bottom right (Q4)
+        if m & 0xF:
+            self.register_updates(y - yr if m & 0x3 else y, y + yr if m & 0xC else y,
+                                  x - xr if m & 0x6 else x, x + xr if m & 0x9 else x)
+
+    def poly(self, x, y, coords, c, *args, **kwargs):
+        super().poly(x, y, coords, c, *args, **kwargs)
+        # the extent of the vertices, moved by (x, y)
+        if len(coords) >= 2:
+            (x0, y0) = (x1, y1) = (coords[0], coords[1])
+            for i in range(2, len(coords) - 1, 2):
+                (vx, vy) = (coords[i], coords[i + 1])
+                if vx < x0:
+                    x0 = vx
+                elif vx > x1:
+                    x1 = vx
+                if vy < y0:
+                    y0 = vy
+                elif vy > y1:
+                    y1 = vy
+            self.register_updates(y + y0, y + y1, x + x0, x + x1)
+
+    # conditionally define optimisations for framebuf extension if loaded
+    if _fb_variant == 2:
+        def large_text(self, s, x, y, m, c=1, r=0, *args, **kwargs):
+            horizontal = r is None or r % 360 // 90 in (0, 2)
+            cache = self._glyphs
+            if (cache is None or kwargs or not 0 < m <= _GLYPH_SCALES
+                    or c not in (0, 1) or r not in _GLYPH_TURNS or len(args) > 1
+                    or args and args[0] is not None and args[0] not in _GLYPH_TURNS):
+                try:
+                    super().large_text(s, x, y, m, c, r, *args, **kwargs)
+                except:
+                    raise Exception("extended framebuffer v206+ required")
+            else:
+                # each glyph is blitted from the cache, in the 8m x 8m cell
+                # the string takes up from (x, y), with its background as key
+                (gx, gy, step) = (x, y, 8 * m)
+                for ch in s:
+                    glyph = cache.glyph(ch, m, c, r, args)
+                    if glyph is None:
+                        super().large_text(ch, gx, gy, m, c, r, *args)
+                    else:
+                        super().blit(glyph, gx, gy, 1 - c)
+                    if horizontal:
+                        gx += step
+                    else:
+                        gy += step
+            h = (8 * m) * (1 if horizontal else len(s))
+            w = (8 * m) * (len(s) if horizontal else 1)
+            self.register_updates(y, y + h - 1, x, x + w - 1)
+
+        def glyph_cache(self, max_bytes=2048):
+            """
+            keeps the glyphs drawn by large_text(), scaled and rotated, up to
+            max_bytes, so that text drawn again is blitted from the cache
+            instead of drawn pixel by pixel; returns the GlyphCache, with its
+            hits and misses, or with max_bytes=0 drops the cache and returns None
+            """
+            if max_bytes <= 0:
+                self._glyphs = None
+            elif self._glyphs is None:
+                self._glyphs = GlyphCache(framebuf.MONO_VLSB if self.rotate90
+                                          else framebuf.MONO_HMSB, max_bytes)
+            else:
+                self._glyphs.max_bytes = max_bytes
+                while self._glyphs.nbytes > max_bytes:
+                    self._glyphs._drop()
+            return self._glyphs
+
+        def circle(self, x, y, radius, c, f:bool = None):
+            super().circle(x, y, radius, c, f)
+            self.register_updates(y-radius, y+radius, x-radius, x+radius)
+        
+        def triangle(self, x0, y0, x1, y1, x2, y2, c, f: bool = None):
+            super().triangle(x0, y0, x1, y1, x2, y2, c, f)
+            self.register_updates(min(y0, y1, y2), max(y0, y1, y2),
+                                  min(x0, x1, x2), max(x0, x1, x2))
+
+    def register_updates(self, y0, y1=None, x0=None, x1=None):
+        # this function takes the top and optional bottom address of the changes made
+        # and updates the pages_to_change list with any changed pages
+        # that are not yet on the list, the optional left and right addresses
+        # limit the span of columns that show() sends for each page
+        y1 = y0 if y1 is None else y1
+        # rearrange the coordinates if they were given from bottom to top or right to left
+        if y0 > y1:
+            y0, y1 = y1, y0
+        if x0 is None:
+            (x0, x1) = (0, self.width - 1)
+        elif x1 is None:
+            x1 = x0
+        elif x0 > x1:
+            x0, x1 = x1, x0
+        # ignore changes that are entirely off-screen, clip the rest to the screen
+        if y1 < 0 or y0 >= self.height or x1 < 0 or x0 >= self.width:
+            return
+        y0 = max(y0, 0)
+        y1 = min(y1, self.height - 1)
+        x0 = max(x0, 0)
+        x1 = min(x1, self.width - 1)
+        if not self.rotate90:
+            (x0, x1) = (x0 >> 3, x1 >> 3)
+        (update_start, update_end) = (self.update_start, self.update_end)
+        for page in range(y0 >> 3, (y1 >> 3) + 1):
+            if self.pages_to_update & (1 << page):
+                if x0 < update_start[page]:
+                    update_start[page] = x0
+                if x1 > update_end[page]:
+                    update_end[page] = x1
+            else:
+                self.pages_to_update |= 1 << page
+                update_start[page] = x0
+                update_end[page] = x1
+
+
+class Viewport(DirtyFrameBuffer):
+    """
+    a rectangle of a display with its own coordinates, to which drawing is
+    clipped, and its own record of changes, sent by flush() or by the
+    display's show(). The rectangle starts on a whole byte of the
+    framebuffer: y is a multiple of 8 at 90 or 270 degrees, x at 0 or 180
+    """
+    def __init__(self, display, x, y, width, height):
+        if (x < 0 or y < 0 or width < 1 or height < 1
+                or x + width > display.width or y + height > display.height):
+            raise ValueError("viewport outside the display")
+        if display.rotate90:
+            if y & 7:
+                raise ValueError("viewport y must be a multiple of 8 at 90 or 270 degrees")
+            (offset, format) = ((y >> 3) * display.width + x, framebuf.MONO_VLSB)
+        else:
+            if x & 7:
+                raise ValueError("viewport x must be a multiple of 8 at 0 or 180 degrees")
+            (offset, format) = (y * display.row_width + (x >> 3), framebuf.MONO_HMSB)
+        self.display = display
+        self.x = x
+        self.y = y
+        # a view of the display's framebuffer, with the display's line length
+        super().__init__(memoryview(display.displaybuf)[offset:], width, height,
+                         format, display.width)
+        display._viewports.append(self)
+
+    def flush(self, full_update=False):
+        # sends the changes drawn in the viewport (or all of it with
+        # full_update) to the display, leaving the display's other changes
+        self.display.show(full_update, (self,))
+
+    def close(self):
+        # leaves the changes not yet sent to the display's next show() and
+        # stops tracking the viewport
+        d = self.display
+        d.pages_to_update = self._add_to(d.pages_to_update, d.update_start, d.update_end)
+        d._viewports.remove(self)
+
+    def _add_to(self, pages, starts, ends, full_update=False):
+        # adds the viewport's changes (or all of it with full_update) in the
+        # display's pages and columns to pages, with their spans in starts and
+        # ends, and returns the pages; the viewport's changes are cleared
+        changed = (1 << self.pages) - 1 if full_update else self.pages_to_update
+        self.pages_to_update = 0
+        if self.rotate90:
+            (last, left) = (self.width - 1, self.x)
+        else:
+            (last, left) = ((self.width - 1) >> 3, self.x >> 3)
+        bottom = self.y + self.height - 1
+        for page in range(self.pages):
+            if changed & (1 << page):
+                if full_update:
+                    (x0, x1) = (left, left + last)
+                else:
+                    (x0, x1) = (left + self.update_start[page], left + self.update_end[page])
+                # at 0 or 180 degrees a page of the viewport may lie across
+                # two pages of the display
+                y0 = self.y + 8 * page
+                for p in range(y0 >> 3, (min(y0 + 7, bottom) >> 3) + 1):
+                    if pages & (1 << p):
+                        if x0 < starts[p]:
+                            starts[p] = x0
+                        if x1 > ends[p]:
+                            ends[p] = x1
+                    else:
+                        pages |= 1 << p
+                        starts[p] = x0
+                        ends[p] = x1
+        return pages
+
+
+class SH1107(DirtyFrameBuffer):
+
+    def __init__(self, width, height, external_vcc, delay_ms=200, rotate=0,
+                 warm_start=False, state=None, transport=None):
+        # the connection used to send commands and display data; without
+        # one, a subclass sends them with its own write_command() and
+        # write_data()
+        if transport is None:
+            if (type(self).write_command is SH1107.write_command
+                    or type(self).write_data is SH1107.write_data):
+                raise ValueError("SH1107 needs a transport, or a subclass "
+                                 "with write_command() and write_data()")
+            transport = _DisplayTransport(self)
+        self.transport = transport
+        self.segment_cost = transport.segment_cost
         self.width = width
         self.height = height
         self.external_vcc = external_vcc
@@ -130,48 +961,148 @@ class SH1107(framebuf.FrameBuffer):
         self.rotate90 = rotate == 90 or rotate == 270
         self.rotate = rotate
         self.inverse = False
+        self.contrast_value = 0
         if self.rotate90:
             self.width, self.height = self.height, self.width
         self.pages = self.height // 8
         self.row_width = self.width // 8
         self.bufsize = self.pages * self.width
-        self.displaybuf = bytearray(self.bufsize)
-        self.displaybuf_mv = memoryview(self.displaybuf)
-        self.pages_to_update = 0
+        # a spare line of bytes after the framebuffer, so that the view of a
+        # Viewport reaching the bottom is as long as FrameBuffer requires
+        # (its lines are stride bytes apart); only bufsize bytes are sent
+        self.displaybuf = bytearray(self.bufsize
+                                    + (self.width if self.rotate90 else self.row_width))
+        self.displaybuf_mv = memoryview(self.displaybuf)[:self.bufsize]
+        self._shadow = None
+        self._shadow_valid = False
         self._is_awake = False
+        # preallocated command buffers and memoryviews so that show() and the
+        # control methods do not allocate memory once the display is running
+        self._command_1Byte = bytearray(1)
+        self._command_2Bytes = bytearray(2)
+        # spans of a page's line are copied into a scratch buffer as long as
+        # the line, and sent through a view of it of their length; spans of
+        # more than 8 bytes are widened to a multiple of 8 bytes, so there are
+        # few lengths and their views are made here
+        line = self.width if self.rotate90 else self.row_width
+        self._scratch = bytearray(line)
+        scratch = memoryview(self._scratch)
+        self._lengths = ([None] + [scratch[:n] for n in range(1, 9)]
+                         + [scratch[:n] for n in range(16, line + 1, 8)])
+        self._flush_start = bytearray(self.pages)
+        self._flush_end = bytearray(self.pages)
+        # the viewports made on the display, and the spans they send
+        self._viewports = []
+        self._view_start = bytearray(self.pages)
+        self._view_end = bytearray(self.pages)
+        # the buffer show() sends from, with the views it sends
+        self._display_source = self._new_source(self.displaybuf)
+        self._source = self._display_source
+        self._front = None
+        self._front_lock = None
+        self._stats = None
+        self._scroll_buf = None
+        self._frame_ms = 0
+        self._frame_requested = False
+        self._frame_full = False
+        self._frame_sent = time.ticks_ms()
+        self.flip_commands = (self._flip_command(False), self._flip_command(True))
         if self.rotate90:
             super().__init__(self.displaybuf, self.width, self.height,
                              framebuf.MONO_VLSB)
         else:
             super().__init__(self.displaybuf, self.width, self.height, 
                              framebuf.MONO_HMSB)
-        self.init_display()
+        self.init_display(warm_start, state)
 
-    def init_display(self):
+    def init_display(self, warm_start=False, state=None):
+        # contrast, invert and flip settings and the sleep status are restored
+        # from a record made by state(), if one is given and valid
+        awake = True
+        # logical line L along the COM axis of the display (y at 90 or 270
+        # degrees, x at 0 or 180 degrees) is kept in display RAM line
+        # (L + _scroll) & 127, and the display start line is moved by
+        # _scroll, so that scroll() need only send the lines it exposes
+        self._scroll = 0
+        self._scroll_pending = False
+        self._start_offset = 0
+        if state is not None and len(state) == 3 and state[0] == _STATE_MARKER:
+            self.contrast_value = state[1]
+            self.inverse = bool(state[2] & 0x01)
+            self.flip_flag = bool(state[2] & 0x02)
+            awake = bool(state[2] & 0x04)
+        if warm_start:
+            # the display has kept its power and settings (eg after a soft reset),
+            # so the reset and power on delays are skipped and the whole
+            # configuration is sent in one command transaction; the display
+            # contents are replaced by the first show()
+            self.fill(0)
+            self.write_command(self._configuration() +
+                               bytes((_SET_DISPLAY_ON if awake else _SET_DISPLAY_OFF,)))
+            self._is_awake = awake
+        else:
+            self.reset()
+            self.poweroff()
+            self.fill(0)
+            self.write_command(self._configuration())
+            self.show(True)
+            self.poweron()
+
+    def _configuration(self):
+        # the start-up commands, including the contrast, invert and flip settings
         multiplex_ratio = 0x7F if (self.height == 128)  else 0x3F
-        self.reset()
-        self.poweroff()
-        self.fill(0)
-        self.write_command((_SET_MULTIPLEX_RATIO | multiplex_ratio).to_bytes(2,"big"))
-        self.write_command((_MEM_ADDRESSING_MODE | (0x00 if self.rotate90 else 0x01)).to_bytes(1,"big"))
-        self.write_command(_SET_PAGE_ADDRESS.to_bytes(1,"big")) # set page address to zero        
-        self.write_command(_SET_DC_DC_CONVERTER_SF.to_bytes(2,"big"))
-        self.write_command(_SET_DISP_CLK_DIV.to_bytes(2,"big"))
-        self.write_command(_SET_VCOM_DSEL_LEVEL.to_bytes(2,"big"))
-        self.write_command(_SET_DIS_PRECHARGE.to_bytes(2,"big"))
-        self.contrast(0)
-        self.invert(0)
-        # requires a call to flip() for setting up
-        self.flip(self.flip_flag)
-        self.poweron()
+        return bytes((_SET_MULTIPLEX_RATIO >> 8, multiplex_ratio,
+                      _MEM_ADDRESSING_MODE | (0x00 if self.rotate90 else 0x01),
+                      _SET_PAGE_ADDRESS, # set page address to zero
+                      _SET_DC_DC_CONVERTER_SF >> 8, _SET_DC_DC_CONVERTER_SF & 0xFF,
+                      _SET_DISP_CLK_DIV >> 8, _SET_DISP_CLK_DIV & 0xFF,
+                      _SET_VCOM_DSEL_LEVEL >> 8, _SET_VCOM_DSEL_LEVEL & 0xFF,
+                      _SET_DIS_PRECHARGE >> 8, _SET_DIS_PRECHARGE & 0xFF,
+                      _SET_DISPLAY_START_LINE >> 8, 0x00,
+                      _SET_CONTRAST >> 8, self.contrast_value & 0xFF,
+                      _SET_NORMAL_INVERSE | (self.inverse & 1))
+                    ) + self.flip_commands[1 if self.flip_flag else 0]
+
+    def state(self):
+        """
+        returns a 3 byte record of the contrast, invert and flip settings and
+        the sleep status, which can be kept (eg in RTC memory or a file) and
+        given to the constructor to restore them after a soft reset or deep sleep
+        """
+        flags = ((0x01 if self.inverse else 0) | (0x02 if self.flip_flag else 0)
+                 | (0x04 if self._is_awake else 0))
+        return bytes((_STATE_MARKER, self.contrast_value & 0xFF, flags))
+
+    def write_register(self, command):
+        """
+        writes a single or double byte command, given as an int in the same
+        form as the register definitions, from a preallocated buffer
+        """
+        if command > 0xFF:
+            buf = self._command_2Bytes
+            buf[0] = command >> 8
+            buf[1] = command & 0xFF
+        else:
+            buf = self._command_1Byte
+            buf[0] = command
+        self._command(buf)
+
+    def _command(self, buf):
+        # with double buffering, commands wait for a background update to finish
+        lock = self._front_lock
+        if lock is None:
+            self.write_command(buf)
+        else:
+            with lock:
+                self.write_command(buf)
 
     def poweron(self):
-        self.write_command(_SET_DISPLAY_ON.to_bytes(1,"big"))
+        self.write_register(_SET_DISPLAY_ON)
         self._is_awake = True
         time.sleep_ms(self.delay_ms) # SH1107 datasheet recommends a delay in power on sequence
         
     def poweroff(self):
-        self.write_command(_SET_DISPLAY_OFF.to_bytes(1,"big"))
+        self.write_register(_SET_DISPLAY_OFF)
         self._is_awake = False
 
     def sleep(self, value=True):
@@ -184,9 +1115,9 @@ class SH1107(framebuf.FrameBuffer):
     def is_awake(self) -> bool:
         return self._is_awake
 
-    def flip(self, flag=None, update=True):
-        if flag is None:
-            flag = not self.flip_flag
+    def _flip_command(self, flag):
+        # the display offset, segment re-map and scan direction commands
+        # for this rotation and display size, flipped or not
         if self.height == 128 and self.width == 128:
             row_offset = 0x00
         elif self.rotate90:
@@ -195,9 +1126,14 @@ class SH1107(framebuf.FrameBuffer):
             row_offset = 0x20 if (self.rotate == 180) ^ flag else 0x60
         remap = 0x00 if (self.rotate in (90, 180)) ^ flag else 0x01 
         direction = 0x08 if (self.rotate in (180, 270)) ^ flag else 0x00
-        self.write_command((_SET_DISPLAY_OFFSET | row_offset).to_bytes(2,"big"))
-        self.write_command((_SET_SEGMENT_REMAP  | remap ).to_bytes(1,"big") )
-        self.write_command((_SET_SCAN_DIRECTION | direction ).to_bytes(1,"big") )
+        return bytes(((_SET_DISPLAY_OFFSET >> 8), row_offset,
+                      _SET_SEGMENT_REMAP | remap,
+                      _SET_SCAN_DIRECTION | direction))
+
+    def flip(self, flag=None, update=True):
+        if flag is None:
+            flag = not self.flip_flag
+        self._command(self.flip_commands[1 if flag else 0])
         self.flip_flag = flag
         if update:
             self.show(True) # full update
@@ -206,156 +1142,704 @@ class SH1107(framebuf.FrameBuffer):
         """
         17. Set Display Start Line:（Double Bytes Command）
         valid values are 0 (Power on /Reset) to 127 (x00-x7F)
+        (relative to the lines moved by scroll())
         """
-        self.write_command((_SET_DISPLAY_START_LINE | (value & 0x7F)).to_bytes(2,"big"))
+        self._start_offset = value & 0x7F
+        self.write_register(_SET_DISPLAY_START_LINE | ((value + self._scroll) & 0x7F))
         
     def contrast(self, contrast):
         """
         4. contrast can be between 0 (low), 0x80 (POR) and 0xff (high)
         the segment current increases with higher values
         """
-        self.write_command((_SET_CONTRAST | (contrast & 0xFF)).to_bytes(2,"big"))
+        self.write_register(_SET_CONTRAST | (contrast & 0xFF))
+        self.contrast_value = contrast & 0xFF
 
     def invert(self, invert=None):
         if invert == None:
             invert = not self.inverse
-        self.write_command((_SET_NORMAL_INVERSE | (invert & 1)).to_bytes(1,"big"))
+        self.write_register(_SET_NORMAL_INVERSE | (invert & 1))
         self.inverse = invert
 
-    def show(self, full_update: bool = False):
-#         _start = time.ticks_us()
-        (w, p, db_mv) = (self.width, self.pages, self.displaybuf_mv)
-        current_page = 1
+    def shadow_buffer(self, enable=True):
+        """
+        keeps a copy of the data last sent to the display so that show() sends
+        only the bytes that have really changed, at a memory cost of one more
+        framebuffer; returns the number of bytes used by the copy
+        """
+        if enable:
+            if self._shadow is None:
+                self._shadow = bytearray(self.bufsize)
+                self._shadow_valid = False  # the next show() sends every page
+        else:
+            self._shadow = None
+        return 0 if self._shadow is None else len(self._shadow)
+
+    def frame_stats(self, enable=True, window=32):
+        """
+        starts (or with enable=False stops) keeping statistics of the screen
+        updates, returned as a FrameStats object; each update sent (by a
+        show() call, a part of a show_async() call or the background thread)
+        is counted, with its time, pages, bytes and transactions. Disabled,
+        the statistics cost nothing.
+        """
+        if enable:
+            if self._stats is None:
+                self._stats = FrameStats(self.pages, window)
+                self.transport = _StatsTransport(self.transport, self._stats)
+        elif self._stats is not None:
+            self.transport = self.transport.transport
+            self._stats = None
+        return self._stats
+
+    def show(self, full_update: bool = False, viewports=None, region=None):
+        # (a scroll waiting to be shown, or a shadow buffer not yet filled,
+        # needs the other changes sent too)
+        if (not self._scroll_pending and (self._shadow is None or self._shadow_valid)):
+            if viewports is not None:
+                self._show_viewports(viewports, full_update)
+                return
+            if region is not None:
+                self._show_region(region, full_update)
+                return
+        if self._front is not None:
+            self.swap(full_update)
+            return
+        self._collect_viewports()
+        if self._shadow is not None and not self._shadow_valid:
+            full_update = True
         if full_update:
-            pages_to_update = (1 << p) - 1
+            pages_to_update = (1 << self.pages) - 1
         else:
             pages_to_update = self.pages_to_update
-        if self.rotate90:
-            buffer_3Bytes = bytearray(3)
-            buffer_3Bytes[1] = _LOW_COLUMN_ADDRESS
-            buffer_3Bytes[2] = _HIGH_COLUMN_ADDRESS
-            for page in range(p):
-                if pages_to_update & current_page:
-                    buffer_3Bytes[0] = _SET_PAGE_ADDRESS | page
-                    self.write_command(buffer_3Bytes)
-                    page_start = w * page
-                    self.write_data(db_mv[page_start : page_start + w])
-                current_page <<= 1
+        self.pages_to_update = 0
+        stats = self._stats
+        if stats is not None:
+            stats._begin()
+        self._flush(pages_to_update, self.update_start, self.update_end, full_update)
+        if stats is not None:
+            stats._end()
+        if full_update and self._shadow is not None:
+            self._shadow_valid = True
+
+    def _show_viewports(self, viewports, full_update):
+        # sends only the changes drawn in the viewports given (all of each
+        # with full_update), leaving the other changes for a later show()
+        (starts, ends) = (self._view_start, self._view_end)
+        pages = 0
+        for viewport in viewports:
+            pages = viewport._add_to(pages, starts, ends, full_update)
+        self._show_spans(pages, starts, ends)
+
+    def _show_region(self, region, full_update):
+        # sends only the changes in a rectangle (x, y, width, height), or in
+        # a range of pages, (all of it with full_update) and takes them off
+        # the changes waiting, leaving the rest for a later show()
+        last = self.width - 1 if self.rotate90 else self.row_width - 1
+        if isinstance(region, range):
+            if not len(region):
+                return
+            (first_page, last_page) = (region[0], region[-1])
+            (c0, c1) = (0, last)
         else:
-            row_bytes = w // 8
-            buffer_2Bytes = bytearray(2)
-            for start_row in range(0, p * 8, 8):
+            (x, y, w, h) = region
+            (x0, x1) = (max(x, 0), min(x + w, self.width) - 1)
+            (y0, y1) = (max(y, 0), min(y + h, self.height) - 1)
+            if x0 > x1 or y0 > y1:
+                return
+            # whole bytes are sent, so the region is widened to pages (and
+            # at 0 or 180 degrees to byte columns)
+            (first_page, last_page) = (y0 >> 3, y1 >> 3)
+            (c0, c1) = (x0, x1) if self.rotate90 else (x0 >> 3, x1 >> 3)
+        self._collect_viewports()
+        (update_start, update_end) = (self.update_start, self.update_end)
+        (starts, ends) = (self._view_start, self._view_end)
+        pages = 0
+        for page in range(max(first_page, 0), min(last_page, self.pages - 1) + 1):
+            bit = 1 << page
+            (start, end) = (c0, c1)
+            if self.pages_to_update & bit:
+                (changed_start, changed_end) = (update_start[page], update_end[page])
+                if not full_update:
+                    start = max(changed_start, c0)
+                    end = min(changed_end, c1)
+                # the changes left on one side of the region are kept, and
+                # with changes on both sides the page's span is kept whole
+                if c0 <= changed_start and changed_end <= c1:
+                    self.pages_to_update &= ~bit
+                elif c0 <= changed_start <= c1:
+                    update_start[page] = c1 + 1
+                elif c0 <= changed_end <= c1:
+                    update_end[page] = c0 - 1
+            elif not full_update:
+                continue
+            if start <= end:
+                pages |= bit
+                starts[page] = start
+                ends[page] = end
+        self._show_spans(pages, starts, ends)
+
+    def _show_spans(self, pages, starts, ends):
+        # sends the pages given, with the spans in starts and ends, through
+        # the background thread with double buffering
+        if not pages:
+            return
+        if self._front is not None:
+            self._hand_over(pages, starts, ends, False, True)
+            return
+        stats = self._stats
+        if stats is not None:
+            stats._begin()
+        self._flush(pages, starts, ends)
+        if stats is not None:
+            stats._end(True)
+
+    def _collect_viewports(self):
+        # adds the changes drawn in the viewports to the display's
+        for viewport in self._viewports:
+            if viewport.pages_to_update:
+                self.pages_to_update = viewport._add_to(
+                    self.pages_to_update, self.update_start, self.update_end)
+
+    def frame_rate(self, fps=0):
+        """
+        sets the maximum rate of the updates made by request_show() and
+        poll(), in frames per second, or with 0 (the default) makes
+        request_show() update the display at once; returns the frame
+        interval in milliseconds
+        """
+        self._frame_ms = 1000 // fps if fps > 0 else 0
+        return self._frame_ms
+
+    def request_show(self, full_update: bool = False):
+        """
+        asks for the display to be updated; with a frame rate set, requests
+        are combined and the update is made by this call or by poll() once
+        the frame interval since the last update has passed
+        """
+        self._frame_requested = True
+        if full_update:
+            self._frame_full = True
+        self.poll()
+
+    def poll(self):
+        """
+        makes the update asked for by request_show() if the frame interval
+        has passed, returning True if it did; to be called from the main loop
+        """
+        if (self._frame_requested and
+            time.ticks_diff(time.ticks_ms(), self._frame_sent) >= self._frame_ms):
+            self.show_now(self._frame_full)
+            return True
+        return False
+
+    def show_now(self, full_update: bool = False):
+        """
+        updates the display at once, including any requested update, and
+        starts a new frame interval
+        """
+        full_update = full_update or self._frame_full
+        self._frame_requested = False
+        self._frame_full = False
+        self._frame_sent = time.ticks_ms()
+        self.show(full_update)
+
+    async def show_async(self, full_update: bool = False, budget=0, frame_ms=0):
+        """
+        updates the display like show(), but yields to the asyncio event loop
+        after each page, or after about budget bytes if given. Drawing done
+        while the update runs is sent by the next call. With frame_ms, pages
+        not sent within that many milliseconds are left for the next call,
+        unless the update shows a scroll, whose display start line is moved
+        after the last page.
+        """
+        if self._front is not None:
+            self.swap(full_update)
+            return
+        try:
+            import asyncio
+        except ImportError:
+            import uasyncio as asyncio
+        self._collect_viewports()
+        started = time.ticks_ms()
+        scroll = self._scroll
+        if self._shadow is not None and not self._shadow_valid:
+            full_update = True
+        if full_update:
+            pages_to_update = (1 << self.pages) - 1
+        else:
+            pages_to_update = self.pages_to_update
+        # the changed spans are copied so that drawing can continue meanwhile
+        (update_start, update_end) = (self._flush_start, self._flush_end)
+        update_start[:] = self.update_start
+        update_end[:] = self.update_end
+        self.pages_to_update = 0
+        page_bytes = 1 if self.rotate90 else 8
+        (batch, batch_bytes, current_page) = (0, 0, 1)
+        # the batches make one frame of the statistics
+        stats = self._stats
+        if stats is not None:
+            stats._begin()
+        try:
+            for page in range(self.pages):
                 if pages_to_update & current_page:
-                    for row in range(start_row, start_row + 8):
-                        buffer_2Bytes[0] = row & 0x0f  # low column (low col. cmd is 0x00)
-                        buffer_2Bytes[1] = _HIGH_COLUMN_ADDRESS | (row >> 4) 
-                        self.write_command(buffer_2Bytes)
-                        slice_start = row * row_bytes
-                        self.write_data(db_mv[slice_start : slice_start + row_bytes])
+                    batch |= current_page
+                    if full_update:
+                        batch_bytes += self.bufsize // self.pages
+                    else:
+                        batch_bytes += (update_end[page] - update_start[page] + 1) * page_bytes
+                    if batch_bytes >= budget:
+                        remaining = pages_to_update & ~((current_page << 1) - 1)
+                        # a scroll is shown with the last batch, after the lines
+                        # it exposes, which may be in any batch
+                        self._flush(batch, update_start, update_end, full_update,
+                                    last=not remaining)
+                        (batch, batch_bytes) = (0, 0)
+                        if not remaining:
+                            break
+                        # (an update showing a scroll is not cut short, which
+                        # would leave the exposed lines at the other edge)
+                        if (frame_ms and not self._scroll_pending
+                                and time.ticks_diff(time.ticks_ms(), started) >= frame_ms):
+                            self._defer(remaining, update_start, update_end, full_update)
+                            return
+                        await asyncio.sleep(0)
+                        if self._scroll != scroll:
+                            # scroll() has moved the pages still to send
+                            self.register_updates(0, self.height - 1)
+                            return
                 current_page <<= 1
+            if batch or self._scroll_pending:
+                self._flush(batch, update_start, update_end, full_update)
+            if full_update and self._shadow is not None:
+                self._shadow_valid = True
+        finally:
+            if stats is not None:
+                stats._end()
+
+    def _defer(self, pages_to_update, update_start, update_end, full_update=False):
+        # returns pages not sent to the pages to update, merging their spans
+        self.pages_to_update = self._merge_updates(
+            pages_to_update, update_start, update_end, full_update,
+            self.pages_to_update, self.update_start, self.update_end)
+
+    def _merge_updates(self, pages, starts, ends, full_update, to_pages, to_starts, to_ends):
+        # adds pages and their spans to the pages and spans in to_pages,
+        # to_starts and to_ends, returning the combined pages
+        full = (self.width if self.rotate90 else self.row_width) - 1
+        for page in range(self.pages):
+            bit = 1 << page
+            if pages & bit:
+                (start, end) = (0, full) if full_update else (starts[page], ends[page])
+                if to_pages & bit:
+                    start = min(start, to_starts[page])
+                    end = max(end, to_ends[page])
+                to_starts[page] = start
+                to_ends[page] = end
+        return to_pages | pages
+
+    def double_buffer(self, enable=True):
+        """
+        with double buffering, show() and swap() copy the framebuffer and hand
+        it over to a background thread (on the second core of a RP2040) which
+        updates the display, so that the next frame can be drawn meanwhile;
+        returns the number of bytes used by the second buffer
+        """
+        if enable and self._front is None:
+            import _thread
+            # the background thread sends the framebuffer lines unmoved
+            self._unscroll()
+            self._front = bytearray(self.bufsize)
+            self._front_source = self._new_source(self._front)
+            self._front_start = bytearray(self.pages)
+            self._front_end = bytearray(self.pages)
+            self._front_pages = 0
+            self._front_full = False
+            self.frames_dropped = 0
+            self._running = True
+            self._signalled = False
+            self._frame_ready = _thread.allocate_lock()
+            self._frame_ready.acquire()
+            self._stopped = _thread.allocate_lock()
+            self._stopped.acquire()
+            self._front_lock = _thread.allocate_lock()
+            _thread.start_new_thread(self._background_updates, ())
+        elif not enable and self._front is not None:
+            # the frame handed over last is sent before the thread ends
+            with self._front_lock:
+                self._running = False
+                self._signal_frame()
+            self._stopped.acquire()
+            self._front = None
+            self._front_lock = None
+        return 0 if self._front is None else len(self._front)
+
+    def swap(self, full_update: bool = False, wait=True):
+        """
+        hands the framebuffer over to the background thread and returns at
+        once, unless the previous frame is still being sent: then it waits,
+        or with wait=False it returns False and the frame is dropped (its
+        changes are sent with the next frame). A frame handed over but not
+        yet started is replaced by the newer one.
+        """
+        self._collect_viewports()
+        if not self._hand_over((1 << self.pages) - 1 if full_update else self.pages_to_update,
+                               self.update_start, self.update_end, full_update, wait):
+            return False
         self.pages_to_update = 0
-#         print("screen update used ", (time.ticks_us() - _start) / 1000, "ms")
+        return True
 
-    def pixel(self, x, y, c=None):
-        if c is None:
-            return super().pixel(x, y)
-        else:
-            super().pixel(x, y , c)
-            page = y // 8
-            self.pages_to_update |= 1 << page
+    def _hand_over(self, pages, starts, ends, full_update, wait):
+        # copies the framebuffer for the background thread, to send the pages
+        # given with the spans in starts and ends; returns False if the frame
+        # is dropped
+        if not self._front_lock.acquire(1 if wait else 0):
+            self.frames_dropped += 1
+            return False
+        try:
+            if self._front_pages:
+                self.frames_dropped += 1
+            self._front[:] = self.displaybuf_mv
+            if full_update:
+                self._front_full = True
+            self._front_pages = self._merge_updates(
+                pages, starts, ends, full_update,
+                self._front_pages, self._front_start, self._front_end)
+            self._signal_frame()
+        finally:
+            self._front_lock.release()
+        return True
 
-    def text(self, text, x, y, c=1):
-        super().text(text, x, y, c)
-        self.register_updates(y, y + 7)
+    def _signal_frame(self):
+        if not self._signalled:
+            self._signalled = True
+            self._frame_ready.release()
 
-    def line(self, x0, y0, x1, y1, c):
-        super().line(x0, y0, x1, y1, c)
-        self.register_updates(y0, y1)
+    def _background_updates(self):
+        # runs in the background thread, sending each frame handed over by swap()
+        while True:
+            self._frame_ready.acquire()
+            with self._front_lock:
+                self._signalled = False
+                pages = self._front_pages
+                full_update = self._front_full or (self._shadow is not None
+                                                   and not self._shadow_valid)
+                if pages or full_update:
+                    if full_update:
+                        pages = (1 << self.pages) - 1
+                    (self._front_pages, self._front_full) = (0, False)
+                    stats = self._stats
+                    if stats is not None:
+                        stats._begin()
+                    self._flush(pages, self._front_start, self._front_end,
+                                full_update, self._front_source)
+                    if stats is not None:
+                        stats._end()
+                    if full_update and self._shadow is not None:
+                        self._shadow_valid = True
+                if not self._running:
+                    break
+        self._stopped.release()
 
-    def hline(self, x, y, w, c):
-        super().hline(x, y, w, c)
-        self.register_updates(y)
+    def _flush(self, pages_to_update, update_start, update_end, full_update=False,
+               source=None, last=True):
+        # sends the given pages of the framebuffer (or of the source buffer
+        # given) to the display, with update_start and update_end giving the
+        # span of each page to send; last is False for the batches of
+        # show_async() before its last one
+        (w, p) = (self.width, self.pages)
+        diff = self._shadow is not None and not full_update
+        current_page = 1
+        if self._scroll and source is None:
+            pages_to_update = self._compose(pages_to_update, update_start,
+                                            update_end, full_update)
+            (update_start, update_end) = (self._ram_start, self._ram_end)
+            source = self._scroll_source
+        self._source = self._display_source if source is None else source
+        stats = self._stats
+        if stats is not None:
+            started = time.ticks_us()
+        self.begin_write()
+        try:
+            if self.rotate90:
+                for page in range(p):
+                    if pages_to_update & current_page:
+                        if full_update:
+                            (start, end) = (0, w - 1)
+                        else:
+                            (start, end) = (update_start[page], update_end[page])
+                        self._send(page, start, w * page + start, end - start + 1, diff)
+                    current_page <<= 1
+            else:
+                # in vertical addressing mode each row of the framebuffer is one
+                # column of the display, each byte in the row fills the next page
+                # (the MONO_HMSB bytes are already in the display's page format),
+                # after the last page the display moves on to the next column
+                row_bytes = w // 8
+                full_span = row_bytes - self.segment_cost
+                run = -1  # first row of consecutive whole groups waiting to be sent
+                for start_row in range(0, p * 8, 8):
+                    whole = False
+                    if pages_to_update & current_page:
+                        if full_update:
+                            (start, end) = (0, row_bytes - 1)
+                        else:
+                            group = start_row >> 3
+                            (start, end) = (update_start[group], update_end[group])
+                        # a span wraps around past the last page (start > end)
+                        # when scroll() has moved its lines there, then each row
+                        # takes two segments
+                        span = (end - start + 1 if start <= end
+                                else row_bytes - start + end + 1 + self.segment_cost)
+                        # whole rows of the group are sent when that costs less
+                        # than addressing each row separately
+                        whole = not diff and span >= full_span
+                    if run >= 0 and not whole:
+                        self._send(0, run, run * row_bytes, (start_row - run) * row_bytes)
+                        run = -1
+                    if whole:
+                        if run < 0:
+                            run = start_row
+                    elif pages_to_update & current_page:
+                        for row in range(start_row, start_row + 8):
+                            if start <= end:
+                                self._send(start, row, row * row_bytes + start, end - start + 1, diff)
+                            else:
+                                self._send(start, row, row * row_bytes + start, row_bytes - start, diff)
+                                self._send(0, row, row * row_bytes, end + 1, diff)
+                    current_page <<= 1
+                if run >= 0:
+                    # consecutive whole groups, up to the full frame, are streamed in one transfer
+                    self._send(0, run, run * row_bytes, (p * 8 - run) * row_bytes)
+        finally:
+            self.end_write()
+        if self._scroll_pending and last:
+            # the start line is moved once the exposed lines have been sent
+            self._scroll_pending = False
+            self.write_register(_SET_DISPLAY_START_LINE
+                                | ((self._scroll + self._start_offset) & 0x7F))
+        if stats is not None:
+            stats._add(pages_to_update, started)
 
-    def vline(self, x, y, h, c):
-        super().vline(x, y, h, c)
-        self.register_updates(y, y + h - 1)
+    def _compose(self, pages_to_update, update_start, update_end, full_update):
+        # makes the display RAM contents of the changed areas, with the lines
+        # moved by scroll(), in the scroll buffer; returns the pages to send,
+        # with their spans in _ram_start and _ram_end
+        (s, src, dst) = (self._scroll, self.displaybuf, self._scroll_buf)
+        (ram_start, ram_end) = (self._ram_start, self._ram_end)
+        ram_pages = 0
+        if self.rotate90:
+            # the pages are along the COM axis, each goes to one or two RAM pages
+            w = self.width
+            for page in range(self.pages):
+                if pages_to_update & (1 << page):
+                    if full_update:
+                        (start, end) = (0, w - 1)
+                    else:
+                        (start, end) = (update_start[page], update_end[page])
+                    for q in (((8 * page + s) >> 3) & 15, ((8 * page + 7 + s) >> 3) & 15):
+                        if ram_pages & (1 << q):
+                            if start < ram_start[q]:
+                                ram_start[q] = start
+                            if end > ram_end[q]:
+                                ram_end[q] = end
+                        else:
+                            ram_pages |= 1 << q
+                            ram_start[q] = start
+                            ram_end[q] = end
+            for q in range(self.pages):
+                if ram_pages & (1 << q):
+                    # spans are made as _send() widens them
+                    (start, end) = (ram_start[q], ram_end[q])
+                    if end - start >= 8:
+                        end = start + ((end - start + 8) & ~7) - 1
+                        if end >= w:
+                            (start, end) = (start - (end - w + 1), w - 1)
+                    _shift_lines(src, dst, q, s, start, end + 1, 1, w)
+        else:
+            # the spans are along the COM axis, in bytes which are RAM pages
+            row_bytes = self.row_width
+            for group in range(self.pages):
+                if pages_to_update & (1 << group):
+                    if full_update:
+                        (start, end) = (0, row_bytes - 1)
+                    else:
+                        (start, end) = (update_start[group], update_end[group])
+                    (q0, q1) = ((8 * start + s) >> 3, (8 * end + 7 + s) >> 3)
+                    if q0 > 15:
+                        (q0, q1) = (q0 - 16, q1 - 16)
+                    elif q1 > 15:
+                        # the span wraps around past the last page, to q1 - 16
+                        (q0, q1) = (q0, q1 - 16) if q1 - 16 < q0 - 1 else (0, 15)
+                    ram_pages |= 1 << group
+                    ram_start[group] = q0
+                    ram_end[group] = q1
+                    # whole rows are made, as they may be sent whole
+                    for q in range(row_bytes):
+                        _shift_lines(src, dst, q, s, 8 * group, 8 * group + 8,
+                                     row_bytes, 1)
+        return ram_pages
 
-    def fill(self, c):
-        super().fill(c)
-        self.pages_to_update = (1 << self.pages) - 1
+    def begin_write(self):
+        self.transport.begin()
 
-    def blit(self, fbuf, x, y, key=-1, palette=None):
-        super().blit(fbuf, x, y, key, palette)
-        self.register_updates(y, y + self.height)
+    def end_write(self):
+        self.transport.end()
 
-    def scroll(self, x, y):
-        # my understanding is that scroll() does a full screen change
-        super().scroll(x, y)
-        self.pages_to_update = (1 << self.pages) - 1
+    def write_command(self, buf):
+        self.transport.write_command(buf)
 
-    # rect() and fill_rect() amended to be compatible with new rect() method
-    # from latest micropython as well as 1.20.0 and previous versions
-    def fill_rect(self, x, y, w, h, c):
-        try:
-            super().fill_rect(x, y, w, h, c)
-        except:
-            super().rect(x, y, w, h, c, f=True)
-        self.register_updates(y, y + h - 1)
+    def write_data(self, buf):
+        self.transport.write_data(buf)
 
-    def rect(self, x, y, w, h, c, f=None):
-        if f == None or f == False:
-            super().rect(x, y, w, h, c)
+    def write_block(self, page, column, buf):
+        self.transport.write_block(page, column, buf)
+
+    def _new_source(self, buf):
+        # a buffer to send from (the framebuffer, the front buffer of double
+        # buffering or the scroll buffer), with memoryviews of each page and
+        # of the whole frame made once, so that sending does not allocate memory
+        mv = memoryview(buf)[:self.bufsize]
+        n = self.bufsize // self.pages
+        return (buf, [mv[page * n:(page + 1) * n] for page in range(self.pages)] + [mv])
+
+    def _span(self, offset, length):
+        # a span of a line (of at most 8 bytes, or a multiple of 8), copied
+        # into the scratch buffer, as the view of the scratch buffer of its
+        # length, so that sending spans which change does not allocate memory
+        _copy(self._scratch, 0, self._source[0], offset, length)
+        return self._lengths[length if length <= 8 else 7 + (length >> 3)]
+
+    def _send(self, page, column, offset, length, diff=False):
+        # writes length bytes of the framebuffer from offset to the display
+        n = self.bufsize // self.pages
+        if not (diff or length % n):
+            # runs of whole pages: the whole frame is sent in one write, and
+            # other runs as the first page, with the others following on
+            views = self._source[1]
+            if length == self.bufsize:
+                self.write_block(page, column, views[self.pages])
+            else:
+                first = offset // n
+                self.write_block(page, column, views[first])
+                for following in range(first + 1, first + length // n):
+                    self.write_data(views[following])
+            if self._shadow is not None:
+                _copy(self._shadow, offset, self._source[0], offset, length)
+            return
+        if length > 8:
+            # widened to a multiple of 8 bytes, moved back from the end of
+            # the line if need be (the bytes added are sent as they are)
+            n = (length + 7) & ~7
+            if self.rotate90:
+                back = column + n - self.width
+                if back > 0:
+                    column -= back
+            else:
+                # at 0 or 180 degrees the span is along the page address
+                back = page + n - self.row_width
+                if back > 0:
+                    page -= back
+            if back > 0:
+                offset -= back
+            length = n
+        if diff:
+            self._send_changes(page, column, offset, length)
         else:
-            try:
-                super().rect(x, y, w, h, c, f)
-            except:
-                super().fill_rect(x, y, w, h, c)
-        self.register_updates(y, y + h - 1)
-    
-    def ellipse(self, x, y, xr, yr, c, *args, **kwargs):
-        super().ellipse(x, y, xr, yr, c, *args, **kwargs)
-        self.register_updates(y - yr, y + yr)
+            self.write_block(page, column, self._span(offset, length))
+            if self._shadow is not None:
+                _copy(self._shadow, offset, self._source[0], offset, length)
 
-    def poly(self, *args, **kwargs):
-        super().poly(*args, **kwargs)
-        self.pages_to_update = (1 << self.pages) - 1
+    def _send_changes(self, page, column, offset, length):
+        # as _send(), but sends only the runs of bytes that differ from the
+        # shadow copy, merging runs separated by less than segment_cost bytes
+        (db, shadow) = (self._source[0], self._shadow)
+        (end, gap, rotate90) = (offset + length, self.segment_cost, self.rotate90)
+        i = _next_change(db, shadow, offset, end)
+        while i < end:
+            j = _run_end(db, shadow, i, end, gap)
+            if j - i > 8:
+                # widened as the span was, within the span
+                j = i + ((j - i + 7) & ~7)
+                if j > end:
+                    (i, j) = (i - (j - end), end)
+            view = self._span(i, j - i)
+            if rotate90:
+                self.write_block(page, column + i - offset, view)
+            else:
+                self.write_block(page + i - offset, column, view)
+            _copy(shadow, i, db, i, j - i)
+            i = _next_change(db, shadow, j, end)
 
-    # conditionally define optimisations for framebuf extension if loaded
-    if _fb_variant == 2:
-        def large_text(self, s, x, y, m, c=1, r=0, *args, **kwargs):
-            try:
-                super().large_text(s, x, y, m, c, r, *args, **kwargs)
-            except:
-                raise Exception("extended framebuffer v206+ required")
-            h = (8 * m) * (1 if r is None or r % 360 // 90 in (0, 2) else len(s))
-            self.register_updates(y, y + h - 1)
+    def scroll(self, x, y):
+        # the viewports' changes move with the rest
+        self._collect_viewports()
+        (step, across) = (y, x) if self.rotate90 else (x, y)
+        if across or not -128 < step < 128 or self._front is not None:
+            # other scrolls are made in the framebuffer only
+            super().scroll(x, y)
+            return
+        framebuf.FrameBuffer.scroll(self, x, y)
+        if not step:
+            return
+        # scrolls along the COM axis move the display start line instead,
+        # so that only the lines exposed have to be sent
+        if self._scroll_buf is None:
+            self._scroll_buf = bytearray(self.bufsize)
+            self._scroll_source = self._new_source(self._scroll_buf)
+            self._ram_start = bytearray(self.pages)
+            self._ram_end = bytearray(self.pages)
+        self._move_updates(step)
+        self._scroll = (self._scroll - step) & 127
+        self._scroll_pending = True
+        (first, last) = (0, step - 1) if step > 0 else (128 + step, 127)
+        if self.rotate90:
+            self.register_updates(first, last)
+        else:
+            self.register_updates(0, self.height - 1, first, last)
 
-        def circle(self, x, y, radius, c, f:bool = None):
-            super().circle(x, y, radius, c, f)
-            self.register_updates(y-radius, y+radius)
-        
-        def triangle(self, x0, y0, x1, y1, x2, y2, c, f: bool = None):
-            super().triangle(x0, y0, x1, y1, x2, y2, c, f)
-            self.register_updates(min(y0, y1, y2), max(y0, y1, y2))
+    def _unscroll(self):
+        # puts the lines moved by scroll() back in place in the display RAM,
+        # to be sent with the next update
+        if self._scroll or self._scroll_pending:
+            self._scroll = 0
+            self._scroll_pending = False
+            self.display_start_line(self._start_offset)
+            self.register_updates(0, self.height - 1)
 
-    def register_updates(self, y0, y1=None):
-        y1 = min((y1 if y1 is not None else y0), self.height - 1)
-        # this function takes the top and optional bottom address of the changes made
-        # and updates the pages_to_change list with any changed pages
-        # that are not yet on the list
-        start_page = y0 // 8
-        end_page = (y1 // 8) if (y1 is not None) else start_page
-        # rearrange start_page and end_page if coordinates were given from bottom to top
-        if start_page > end_page:
-            start_page, end_page = end_page, start_page
-        # ensure that start and end page values for update are non-negative (-ve is off-screen)
-        if end_page >= 0:
-            if start_page < 0:
-                start_page = 0
-            for page in range(start_page, end_page + 1):
-                self.pages_to_update |= 1 << page
+    def _move_updates(self, step):
+        # moves the changes waiting to be sent by step lines along the COM axis
+        (pages, starts, ends) = (self.pages_to_update, self.update_start, self.update_end)
+        if not pages:
+            return
+        if self.rotate90:
+            (moved, moved_start, moved_end) = (0, self._ram_start, self._ram_end)
+            for page in range(self.pages):
+                if pages & (1 << page):
+                    first = max(8 * page + step, 0) >> 3
+                    last = min(8 * page + 7 + step, 127)
+                    for p in range(first, (last >> 3) + 1 if last >= 0 else 0):
+                        if moved & (1 << p):
+                            moved_start[p] = min(moved_start[p], starts[page])
+                            moved_end[p] = max(moved_end[p], ends[page])
+                        else:
+                            moved |= 1 << p
+                            moved_start[p] = starts[page]
+                            moved_end[p] = ends[page]
+            starts[:] = moved_start
+            ends[:] = moved_end
+            self.pages_to_update = moved
+        else:
+            for group in range(self.pages):
+                if pages & (1 << group):
+                    (first, last) = (8 * starts[group] + step, 8 * ends[group] + 7 + step)
+                    if last < 0 or first > 127:
+                        self.pages_to_update &= ~(1 << group)
+                    else:
+                        starts[group] = max(first, 0) >> 3
+                        ends[group] = min(last, 127) >> 3
 
-    def reset(self, res):
+    def reset(self, res=None):
         if res is not None:
             res(1)
             time.sleep_ms(1)   # sleep for  1 millisecond
@@ -366,58 +1850,31 @@ class SH1107(framebuf.FrameBuffer):
 
 class SH1107_I2C(SH1107):
     def __init__(self, width, height, i2c, res=None, address=0x3d,
-                 rotate=0, external_vcc=False, delay_ms=200):
+                 rotate=0, external_vcc=False, delay_ms=200, combined=False,
+                 warm_start=False, state=None):
         self.i2c = i2c
         self.address = address
         self.res = res
         if res is not None:
             res.init(res.OUT, value=1)
-        super().__init__(width, height, external_vcc, delay_ms, rotate)
-
-    def write_command(self, command_list):
-        self.i2c.writeto(self.address, b"\x00" + command_list)
-
-    def write_data(self, buf):
-        self.i2c.writevto(self.address, (b"\x40", buf))
+        super().__init__(width, height, external_vcc, delay_ms, rotate,
+                         warm_start, state, I2CTransport(i2c, address, combined))
 
     def reset(self):
         super().reset(self.res)
 
 class SH1107_SPI(SH1107):
     def __init__(self, width, height, spi, dc, res=None, cs=None,
-                 rotate=0, external_vcc=False, delay_ms=0):
-        dc.init(dc.OUT, value=0)
+                 rotate=0, external_vcc=False, delay_ms=0, burst=False,
+                 warm_start=False, state=None):
         if res is not None:
             res.init(res.OUT, value=0)
-        if cs is not None:
-            cs.init(cs.OUT, value=1)
         self.spi = spi
         self.dc = dc
         self.res = res
         self.cs = cs
-        super().__init__(width, height, external_vcc, delay_ms, rotate)
-
-    def write_command(self, cmd):
-        if self.cs is not None:
-            self.cs(1)
-            self.dc(0)
-            self.cs(0)
-            self.spi.write(cmd)
-            self.cs(1)
-        else:
-            self.dc(0)
-            self.spi.write(cmd)
-
-    def write_data(self, buf):
-        if self.cs is not None:
-            self.cs(1)
-            self.dc(1)
-            self.cs(0)
-            self.spi.write(buf)
-            self.cs(1)
-        else:
-            self.dc(1)
-            self.spi.write(buf)
+        super().__init__(width, height, external_vcc, delay_ms, rotate,
+                         warm_start, state, SPITransport(spi, dc, cs, burst))
 
     def reset(self):
-        super().reset(self.res)
\ No newline at end of file
+        super().reset(self.res)
@@ -0,0 +1,189 @@
+# MicroPython SH1107 OLED driver, text console
+# a scrolling text console (for example a log) on an SH1107 display, using
+# the 8x8 FrameBuffer font
+#
+# from machine import Pin, I2C
+# import sh1107
+# from sh1107_console import Console
+#
+# i2c0 = I2C(0, scl=Pin(5), sda=Pin(4), freq=400000)
+# display = sh1107.SH1107_I2C(128, 128, i2c0, address=0x3d, rotate=90)
+# display.sleep(False)
+# console = Console(display, scrollback=32)
+# console.write("SH1107 console\n")
+# console.write("temperature %.1f\n" % 21.5)
+#
+# New lines are made with the display's scroll(), which at 90 or 270 degrees
+# moves the display start line, so that adding a line sends only the row of
+# text freed for it (one page), however many lines are kept for scrollback.
+# At 0 or 180 degrees the lines of text run across the COM lines of the
+# display, and each new line updates the whole screen.
+#
+# The MIT License (MIT), see sh1107.py
+
+from micropython import const
+
+_SPACE = const(0x20)
+_UNKNOWN = const(0x3F)  # "?", for characters outside the font
+
+
+class Console:
+    """
+    a text console filling the display, in rows of 8 pixel characters. Text
+    is written at the cursor, wrapping at the right edge; at the bottom of
+    the screen the text moves up a row. The text of the screen and of up to
+    scrollback earlier rows is kept in a ring of row buffers, for view().
+    With auto_show the display is updated after each write() (through
+    request_show(), so within the display's frame_rate() if one is set).
+    """
+
+    def __init__(self, display, c=1, bg=0, scrollback=0, auto_show=True,
+                 cursor=False):
+        self.display = display
+        self.c = c
+        self.bg = bg
+        self.auto_show = auto_show
+        self.columns = display.width // 8
+        self.rows = display.height // 8
+        # ring of row buffers: screen row r is _lines[(_top + r) % len(_lines)]
+        self._lines = [bytearray(b" " * self.columns)
+                       for _ in range(self.rows + scrollback)]
+        self._top = 0
+        self._kept = 0   # rows moved off the screen that can be viewed again
+        self._back = 0   # rows view() has moved back by
+        self.column = 0
+        self.row = 0
+        self._cursor = cursor
+        self.clear()
+
+    def clear(self):
+        # clears the screen and the scrollback, with the cursor at the top left
+        for line in self._lines:
+            line[:] = b" " * self.columns
+        (self._top, self._kept, self._back) = (0, 0, 0)
+        (self.column, self.row) = (0, 0)
+        self.display.fill(self.bg)
+        self._draw_cursor(True)
+        self._update()
+
+    def write(self, text):
+        """
+        writes str or bytes at the cursor, returns the number of characters
+        or bytes written; "\\n" starts a new line, "\\r" returns to the start
+        of the line and "\\b" moves back a character
+        """
+        if self._back:
+            self.view(0)
+        self._draw_cursor(False)
+        if not isinstance(text, str):
+            text = bytes(text).decode()
+        n = len(text)
+        i = 0
+        while i < n:
+            ch = text[i]
+            if ch == "\n":
+                self._new_line()
+                i += 1
+            elif ch == "\r":
+                self.column = 0
+                i += 1
+            elif ch == "\b":
+                self.column = max(self.column - 1, 0)
+                i += 1
+            else:
+                if self.column == self.columns:
+                    self._new_line()
+                # a run of printable characters up to the end of the row is
+                # stored and drawn in one text() call
+                j = i
+                end = min(n, i + self.columns - self.column)
+                while j < end and text[j] not in "\n\r\b":
+                    j += 1
+                self._put(text[i:j])
+                i = j
+        self._draw_cursor(True)
+        self._update()
+        return n
+
+    def cursor(self, column=None, row=None, visible=None):
+        """
+        moves the cursor to column and row (counted from 0, clipped to the
+        screen), and shows or hides it as an underline; returns the cursor
+        position as (column, row)
+        """
+        self._draw_cursor(False)
+        if column is not None:
+            self.column = min(max(column, 0), self.columns - 1)
+        if row is not None:
+            self.row = min(max(row, 0), self.rows - 1)
+        if visible is not None:
+            self._cursor = visible
+        self._draw_cursor(True)
+        self._update()
+        return (self.column, self.row)
+
+    def view(self, back=0):
+        """
+        redraws the screen as it was back rows earlier, up to the number of
+        rows kept for scrollback, or with 0 as it is now; writing returns to
+        the current screen. Returns the number of rows moved back
+        """
+        back = min(max(back, 0), self._kept)
+        self._back = back
+        display = self.display
+        display.fill(self.bg)
+        total = len(self._lines)
+        for r in range(self.rows):
+            line = self._lines[(self._top - back + r) % total]
+            display.text(bytes(line).decode(), 0, 8 * r, self.c)
+        if not back:
+            self._draw_cursor(True)
+        self._update()
+        return back
+
+    def _put(self, s):
+        # stores and draws characters at the cursor, within the row
+        line = self._line(self.row)
+        column = self.column
+        for k in range(len(s)):
+            code = ord(s[k])
+            line[column + k] = code if _SPACE <= code < 0x7F else _UNKNOWN
+        (x, y) = (8 * column, 8 * self.row)
+        self.display.fill_rect(x, y, 8 * len(s), 8, self.bg)
+        self.display.text(bytes(line[column:column + len(s)]).decode(), x, y, self.c)
+        self.column = column + len(s)
+
+    def _new_line(self):
+        self.column = 0
+        if self.row < self.rows - 1:
+            self.row += 1
+            return
+        # the top row goes into the scrollback and the oldest row kept is
+        # reused for the new bottom row, which is all that has to be drawn
+        self._top = (self._top + 1) % len(self._lines)
+        self._kept = min(self._kept + 1, len(self._lines) - self.rows)
+        line = self._line(self.row)
+        line[:] = b" " * self.columns
+        display = self.display
+        display.scroll(0, -8)
+        display.fill_rect(0, 8 * self.row, display.width, 8, self.bg)
+
+    def _line(self, row):
+        return self._lines[(self._top + row) % len(self._lines)]
+
+    def _draw_cursor(self, on):
+        # draws the cursor, or with on=False redraws the character under it
+        if not self._cursor:
+            return
+        column = min(self.column, self.columns - 1)
+        (x, y) = (8 * column, 8 * self.row)
+        display = self.display
+        if on:
+            display.hline(x, y + 7, 8, self.c)
+        else:
+            display.fill_rect(x, y, 8, 8, self.bg)
+            display.text(chr(self._line(self.row)[column]), x, y, self.c)
+
+    def _update(self):
+        if self.auto_show:
+            self.display.request_show()
@@ -0,0 +1,122 @@
+# MicroPython SH1107 OLED driver, proportional bitmap fonts
+# draws text in fonts made with tools/bdf2font.py from BDF fonts. The font
+# data is read-only bytes, which can be frozen into flash with the rest of
+# the firmware and is then read where it is, without a copy in RAM.
+#
+# import sh1107
+# from sh1107_font import Font
+# from helvR12 import FONT            # a module made by tools/bdf2font.py
+#
+# display = sh1107.SH1107_I2C(128, 128, i2c0, address=0x3d, rotate=90)
+# helv = Font(FONT)
+# helv.text(display, "Temperature 21.5", 0, 0)
+# display.show()
+#
+# The glyphs are kept in the layout of the display's framebuffer: MONO_VLSB
+# (as pages of 8 pixels down each column) for displays at 90 or 270 degrees,
+# or MONO_HMSB (as rows of bytes) at 0 or 180 degrees, so that text() ORs
+# (or for colour 0 clears) the glyph bytes straight into the framebuffer,
+# shifted to the pixel position, and registers the area of the text as
+# changed. A font in the other layout still works, through FrameBuffer.blit().
+#
+# font data: a 6 byte header (marker 0x66, layout 0 MONO_VLSB or
+# 1 MONO_HMSB, height, ascent, first and last character code), then for each
+# character from first to last the offset of its glyph from the start of the
+# glyph data (2 bytes, little endian) and its width (advance) in pixels (0
+# for a missing character), then the glyph data. Each glyph is a framebuffer
+# of its width and the font height in the font's layout.
+#
+# The MIT License (MIT), see sh1107.py
+
+from micropython import const
+import framebuf
+from sh1107 import _draw_bits
+
+_FONT_MARKER = const(0x66)
+_HEADER = const(6)
+VLSB = const(0)
+HMSB = const(1)
+
+class Font:
+    """
+    a proportional bitmap font made by tools/bdf2font.py, read from data (bytes,
+    or a memoryview of them) without copying it
+    """
+    def __init__(self, data):
+        data = memoryview(data)
+        if len(data) < _HEADER or data[0] != _FONT_MARKER:
+            raise ValueError("not a font made by bdf2font")
+        self._data = data
+        self.layout = data[1]
+        self.height = data[2]
+        self.ascent = data[3]
+        self.first = data[4]
+        self.last = data[5]
+        self._glyphs = _HEADER + 3 * (self.last - self.first + 1)
+        # the glyph drawn for characters which are not in the font
+        self._default = None
+        self._default = self._index("?")
+        self._scratch = None
+
+    def _index(self, ch):
+        # the table entry of ch, or of the default glyph
+        code = ord(ch)
+        if self.first <= code <= self.last:
+            i = _HEADER + 3 * (code - self.first)
+            if self._data[i + 2]:
+                return i
+        return self._default
+
+    def width(self, s):
+        # the width of s in pixels
+        w = 0
+        data = self._data
+        for ch in s:
+            i = self._index(ch)
+            if i is not None:
+                w += data[i + 2]
+        return w
+
+    def text(self, display, s, x, y, c=1):
+        """
+        draws s on display with its top left corner at (x, y) in colour c,
+        leaving the background as it is, and returns the width drawn
+        """
+        data = self._data
+        height = self.height
+        vlsb = self.layout == VLSB
+        native = vlsb == display.rotate90
+        x0 = x
+        for ch in s:
+            i = self._index(ch)
+            if i is None:
+                continue
+            w = data[i + 2]
+            offset = self._glyphs + (data[i] | data[i + 1] << 8)
+            if native:
+                if vlsb:
+                    _draw_bits(display.displaybuf, data, offset, w, (height + 7) >> 3,
+                               1, display.width, display.pages, x, y, c)
+                else:
+                    _draw_bits(display.displaybuf, data, offset, height, (w + 7) >> 3,
+                               0, display.height, display.width >> 3, y, x, c)
+            else:
+                self._blit(display, offset, w, x, y, c)
+            x += w
+        if x > x0:
+            display.register_updates(y, y + height - 1, x0, x - 1)
+        return x - x0
+
+    def _blit(self, display, offset, w, x, y, c):
+        # draws a glyph whose layout is not the display's through a copy,
+        # which for colour 0 is inverted so that the key skips the background
+        n = w * ((self.height + 7) >> 3) if self.layout == VLSB else self.height * ((w + 7) >> 3)
+        if self._scratch is None or len(self._scratch) < n:
+            self._scratch = bytearray(n)
+        scratch = self._scratch
+        for k in range(n):
+            scratch[k] = self._data[offset + k] ^ (0 if c else 0xFF)
+        glyph = framebuf.FrameBuffer(scratch, w, self.height,
+                                     framebuf.MONO_VLSB if self.layout == VLSB
+                                     else framebuf.MONO_HMSB)
+        framebuf.FrameBuffer.blit(display, glyph, x, y, 1 - c)
@@ -0,0 +1,184 @@
+# MicroPython SH1107 OLED driver, layers
+# a background layer and overlay layers for an SH1107 display, combined into
+# the display's framebuffer only where they have changed
+#
+# import sh1107
+# from sh1107_layers import LayerStack, XOR
+#
+# display = sh1107.SH1107_I2C(128, 128, i2c0, address=0x3d, rotate=90)
+# stack = LayerStack(display)
+# background = stack.background
+# background.rect(0, 0, 128, 128, 1)          # drawn once
+# background.text("temperature", 4, 4, 1)
+# overlay = stack.add()
+# for t in range(100):
+#     overlay.fill_rect(4, 20, 40, 8, 0)
+#     overlay.text(str(t), 4, 20, 1)
+#     stack.show()
+#
+# Each layer is a framebuffer of the size of the display, with the FrameBuffer
+# drawing methods, which record the areas they change as the display's do.
+# compose() (called by show()) rebuilds only the changed spans of the changed
+# pages: it copies the background and combines the overlays into it in turn,
+# a 32 bit word at a time where it can, and marks those spans for the next
+# update of the display. Static content drawn once on the background is not
+# drawn again, and the work of each frame depends on the area changed rather
+# than on the size of the screen. With layers, drawing is done on the layers
+# rather than on the display, whose framebuffer compose() overwrites.
+#
+# The MIT License (MIT), see sh1107.py
+
+from micropython import const
+import framebuf
+from sh1107 import DirtyFrameBuffer
+
+# how an overlay is combined with the layers under it: CLEAR clears the
+# pixels set in the overlay, OR sets them and XOR inverts them
+CLEAR = const(0)
+OR = const(1)
+XOR = const(2)
+_COPY = const(3)  # the background
+
+# combines bytes start to end of a layer into the framebuffer (op as above)
+try:
+    import micropython
+    @micropython.viper
+    def _combine(dst: ptr8, src: ptr8, start: int, end: int, op: int):
+        i = start
+        # bytes up to the first whole word, whole words, then the bytes left
+        while i < end and (i & 3):
+            if op == 3:
+                dst[i] = src[i]
+            elif op == 1:
+                dst[i] = dst[i] | src[i]
+            elif op == 2:
+                dst[i] = dst[i] ^ src[i]
+            else:
+                dst[i] = dst[i] ^ (dst[i] & src[i])
+            i += 1
+        dst32 = ptr32(dst)
+        src32 = ptr32(src)
+        w = i >> 2
+        words = end >> 2
+        while w < words:
+            if op == 3:
+                dst32[w] = src32[w]
+            elif op == 1:
+                dst32[w] = dst32[w] | src32[w]
+            elif op == 2:
+                dst32[w] = dst32[w] ^ src32[w]
+            else:
+                dst32[w] = dst32[w] ^ (dst32[w] & src32[w])
+            w += 1
+        if (w << 2) > i:
+            i = w << 2
+        while i < end:
+            if op == 3:
+                dst[i] = src[i]
+            elif op == 1:
+                dst[i] = dst[i] | src[i]
+            elif op == 2:
+                dst[i] = dst[i] ^ src[i]
+            else:
+                dst[i] = dst[i] ^ (dst[i] & src[i])
+            i += 1
+except:
+    def _combine(dst, src, start, end, op):
+        if op == 3:
+            dst[start:end] = src[start:end]
+        elif op == 1:
+            for i in range(start, end):
+                dst[i] |= src[i]
+        elif op == 2:
+            for i in range(start, end):
+                dst[i] ^= src[i]
+        else:
+            for i in range(start, end):
+                dst[i] &= ~src[i]
+
+
+class Layer(DirtyFrameBuffer):
+    """
+    a layer of a LayerStack: a framebuffer of the display's size and layout,
+    combined with the layers under it by op
+    """
+    def __init__(self, display, op):
+        self.op = op
+        self.displaybuf = bytearray(display.bufsize)
+        super().__init__(self.displaybuf, display.width, display.height,
+                         framebuf.MONO_VLSB if display.rotate90 else framebuf.MONO_HMSB)
+
+
+class LayerStack:
+    """
+    the layers of a display, from the background up; compose() combines
+    the areas changed on any layer into the display's framebuffer
+    """
+    def __init__(self, display):
+        self.display = display
+        self.background = Layer(display, _COPY)
+        self.layers = [self.background]
+        self._start = bytearray(display.pages)
+        self._end = bytearray(display.pages)
+
+    def add(self, op=OR):
+        # a new overlay layer on top of the others
+        layer = Layer(self.display, op)
+        self.layers.append(layer)
+        return layer
+
+    def remove(self, layer):
+        # removes an overlay, updating the area it covered
+        layer.fill(0)
+        self.compose()
+        self.layers.remove(layer)
+
+    def compose(self, full=False):
+        """
+        combines the layers into the display's framebuffer where any has
+        changed since the last call (everywhere with full=True), and marks
+        those areas for the display's next show()
+        """
+        d = self.display
+        layers = self.layers
+        (start, end) = (self._start, self._end)
+        last = d.width - 1 if d.rotate90 else (d.width >> 3) - 1
+        pages = (1 << d.pages) - 1 if full else 0
+        for page in range(d.pages):
+            start[page] = 0 if full else 0xFF
+            end[page] = last if full else 0
+        # the span of each page changed on any layer
+        for layer in layers:
+            changed = layer.pages_to_update
+            if changed:
+                pages |= changed
+                for page in range(d.pages):
+                    if changed & (1 << page):
+                        if layer.update_start[page] < start[page]:
+                            start[page] = layer.update_start[page]
+                        if layer.update_end[page] > end[page]:
+                            end[page] = layer.update_end[page]
+                layer.pages_to_update = 0
+        if not pages:
+            return
+        (buf, width) = (d.displaybuf, d.width)
+        row_bytes = width >> 3
+        for page in range(d.pages):
+            if pages & (1 << page):
+                (s, e) = (start[page], end[page] + 1)
+                if d.rotate90:
+                    for layer in layers:
+                        _combine(buf, layer.displaybuf, page * width + s, page * width + e, layer.op)
+                    d.register_updates(8 * page, 8 * page + 7, s, e - 1)
+                else:
+                    # 8 rows of byte columns s to e
+                    for row in range(8 * page, 8 * page + 8):
+                        offset = row * row_bytes
+                        for layer in layers:
+                            _combine(buf, layer.displaybuf, offset + s, offset + e, layer.op)
+                    d.register_updates(8 * page, 8 * page + 7, 8 * s, 8 * e - 1)
+
+    def show(self, full_update=False):
+        # combines the changed areas and updates the display
+        self.compose(full_update)
+        self.display.show(full_update)
@@ -0,0 +1,162 @@
+# MicroPython SH1107 OLED driver, frame player
+# plays animations and splash screens made with tools/img2frames.py from
+# a file, sending each frame from the file straight to the display
+#
+# import sh1107
+# from sh1107_player import Player
+#
+# display = sh1107.SH1107_I2C(128, 128, i2c0, address=0x3d, rotate=90)
+# player = Player(display, "splash.frm")
+# player.play()           # or: delay = player.next_frame() in a main loop
+# player.close()
+#
+# The frames are stored in the layout of the display's framebuffer, which is
+# the order the display takes its data in, so no decoding is needed: each
+# span of a page is read with readinto() into a buffer of one page and sent
+# to the display, without the framebuffer. Frames after the first can be
+# delta frames, holding only the changed span of each changed page, so that
+# the speed of playback is set by the bus and the amount that changes. The
+# areas drawn by the player are marked in the display's record of changes,
+# so that the next show() puts the framebuffer's contents back there.
+#
+# file format: a 6 byte header (marker 0x67, layout 0 MONO_VLSB for 90 or
+# 270 degrees or 1 MONO_HMSB for 0 or 180 degrees, framebuffer width and
+# height, number of frames as 2 bytes, little endian), then the frames. Each
+# frame has a 3 byte header: the number of spans (0xFF for a key frame) and
+# the time to show the frame in milliseconds (2 bytes, little endian). A key
+# frame is followed by the whole framebuffer. A delta frame is followed by
+# each span: its page, first and last column (byte column in the MONO_HMSB
+# layout) and the bytes of the span, one row of the page after another in the
+# MONO_HMSB layout.
+#
+# The MIT License (MIT), see sh1107.py
+
+from micropython import const
+import time
+
+_MARKER = const(0x67)
+_HEADER = const(6)
+_KEY_FRAME = const(0xFF)
+VLSB = const(0)
+HMSB = const(1)
+
+
+class Player:
+    """
+    plays the frames of a file (a path, or a file opened in binary mode) made
+    by tools/img2frames.py for the size and rotation of the display
+    """
+    def __init__(self, display, stream):
+        self._opened = isinstance(stream, str)
+        if self._opened:
+            stream = open(stream, "rb")
+        self.display = display
+        self.stream = stream
+        header = bytearray(_HEADER)
+        if stream.readinto(header) != _HEADER or header[0] != _MARKER:
+            raise ValueError("not a frame file made by img2frames")
+        if (header[1] != (VLSB if display.rotate90 else HMSB)
+                or header[2] != display.width or header[3] != display.height):
+            raise ValueError("frames made for another display size or rotation")
+        self.frames = header[4] | header[5] << 8
+        self.frame = 0
+        # one page of data, with views of it kept so that playing does not
+        # allocate memory
+        self._page = memoryview(bytearray(display.bufsize // display.pages))
+        self._views = {}
+        self._header = bytearray(3)
+
+    def rewind(self):
+        # goes back to the first frame
+        self.stream.seek(_HEADER)
+        self.frame = 0
+
+    def next_frame(self):
+        """
+        sends the next frame to the display and returns the time to show it
+        in milliseconds, or None after the last frame
+        """
+        if self.frame >= self.frames:
+            return None
+        d = self.display
+        header = self._read(self._header, 3)
+        (spans, delay) = (header[0], header[1] | header[2] << 8)
+        # the background thread of double buffering writes with the lock held
+        lock = d._front_lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            # the frames are in the display RAM's own line order
+            d._unscroll()
+            d.begin_write()
+            try:
+                if spans == _KEY_FRAME:
+                    last = d.width - 1 if d.rotate90 else d.row_width - 1
+                    for page in range(d.pages):
+                        self._span(page, 0, last)
+                else:
+                    for i in range(spans):
+                        span = self._read(self._header, 3)
+                        self._span(span[0], span[1], span[2])
+            finally:
+                d.end_write()
+            # the display no longer shows what the shadow copy holds
+            if d._shadow is not None:
+                d._shadow_valid = False
+        finally:
+            if lock is not None:
+                lock.release()
+        self.frame += 1
+        return delay
+
+    def play(self, loops=1):
+        # plays the frames loops times, or with 0 until interrupted, showing
+        # each for its time
+        played = 0
+        while True:
+            started = time.ticks_ms()
+            delay = self.next_frame()
+            if delay is None:
+                played += 1
+                if loops and played >= loops:
+                    return
+                self.rewind()
+            else:
+                time.sleep_ms(max(0, delay - time.ticks_diff(time.ticks_ms(), started)))
+
+    def close(self):
+        if self._opened:
+            self.stream.close()
+
+    def _span(self, page, first, last):
+        # reads the span of a page from the file and sends it to the display
+        d = self.display
+        n = last - first + 1
+        if d.rotate90:
+            d.write_block(page, first, self._read(self._page, n))
+            d.register_updates(8 * page, 8 * page + 7, first, last)
+        else:
+            # 8 rows of the framebuffer, which are columns of the display
+            data = self._read(self._page, 8 * n)
+            if n == d.row_width:
+                # in vertical addressing mode whole rows run on into the next
+                d.write_block(0, 8 * page, data)
+            else:
+                for row in range(8):
+                    d.write_block(first, 8 * page + row, self._view(row * n, n))
+            d.register_updates(8 * page, 8 * page + 7, 8 * first, 8 * last + 7)
+
+    def _view(self, offset, length):
+        key = offset << 8 | length
+        view = self._views.get(key)
+        if view is None:
+            view = self._page[offset:offset + length]
+            self._views[key] = view
+        return view
+
+    def _read(self, buf, n):
+        # reads n bytes into buf (the page buffer or the header buffer)
+        view = buf if len(buf) == n else self._view(0, n)
+        if self.stream.readinto(view) != n:
+            raise ValueError("frame file is truncated")
+        return view
@@ -0,0 +1,200 @@
+# MicroPython SH1107 OLED driver, sprites
+# small bitmaps (pointers, cursors, game sprites) moved over the contents of
+# an SH1107 display, which are restored where a sprite has been
+#
+# import sh1107
+# from sh1107_sprites import SpriteLayer, XOR
+#
+# display = sh1107.SH1107_I2C(128, 128, i2c0, address=0x3d, rotate=90)
+# layer = SpriteLayer(display)
+# ball = layer.sprite(bytearray(b"\x3c\x7e\xff\xff\xff\xff\x7e\x3c"), 8, 8)
+# cursor = layer.sprite(bytearray(b"\xff\x81\x81\xff"), 4, 4, mode=XOR)
+# for i in range(100):
+#     ball.move(i, 40)
+#     layer.update()
+#     display.show()
+#
+# Each sprite saves the pixels under it before it is drawn (except in XOR
+# mode, where drawing the sprite again removes it), so that moving it sends
+# only its old and new areas to the display. The bitmaps are kept in the
+# layout of the display's framebuffer and drawn by the same helper as the
+# fonts of sh1107_font.py, shifted to any pixel position.
+#
+# The MIT License (MIT), see sh1107.py
+
+from micropython import const
+import framebuf
+from sh1107 import _draw_bits
+
+# sprite modes: OR sets the pixels of the sprite, XOR inverts them, and MASK
+# draws the sprite's pixels (set and clear) where its mask is set
+OR = const(1)
+XOR = const(2)
+MASK = const(3)
+
+
+class _Bitmap(framebuf.FrameBuffer):
+    # a FrameBuffer with readable width and height, which SH1107.blit() uses
+    # as the area to update
+    def __init__(self, buf, width, height, format):
+        super().__init__(buf, width, height, format)
+        self.width = width
+        self.height = height
+
+
+class Sprite:
+    """
+    a sprite of a SpriteLayer, made by SpriteLayer.sprite(); move() and
+    show() take effect at the next SpriteLayer.update()
+    """
+    def __init__(self, layer, data, mask, width, height, mode, x, y):
+        self.layer = layer
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.x = x
+        self.y = y
+        self.visible = True
+        self._data = data
+        self._mask = mask
+        # the pixels under the sprite where it was drawn
+        self._under = None
+        if mode != XOR:
+            self._under = _Bitmap(bytearray(layer._size(width, height)),
+                                  width, height, layer.format)
+        self._drawn = None  # (x, y) where the sprite is drawn, if it is
+
+    def move(self, x, y):
+        self.x = x
+        self.y = y
+
+    def show(self, visible=True):
+        self.visible = visible
+
+    def _changed(self):
+        return self._drawn != ((self.x, self.y) if self.visible else None)
+
+    def _overlaps(self, other):
+        # whether the sprite's area where it is drawn or will be drawn meets
+        # other's area, drawn or to be drawn
+        for a in (self._drawn, (self.x, self.y) if self.visible else None):
+            for b in (other._drawn, (other.x, other.y) if other.visible else None):
+                if (a is not None and b is not None
+                        and a[0] < b[0] + other.width and b[0] < a[0] + self.width
+                        and a[1] < b[1] + other.height and b[1] < a[1] + self.height):
+                    return True
+        return False
+
+
+class SpriteLayer:
+    """
+    sprites over the contents of a display, drawn in the order they were
+    made; update() redraws the sprites that have moved, been shown or hidden,
+    with the sprites overlapping them. Drawing on the display under a sprite
+    should be done between erase() and update()
+    """
+    def __init__(self, display):
+        self.display = display
+        self.vlsb = display.rotate90
+        self.format = framebuf.MONO_VLSB if self.vlsb else framebuf.MONO_HMSB
+        self.sprites = []
+
+    def _size(self, width, height):
+        # bytes of a bitmap in the display's layout
+        if self.vlsb:
+            return width * ((height + 7) >> 3)
+        return height * ((width + 7) >> 3)
+
+    def _native(self, bitmap, width, height, format):
+        # a copy of a bitmap in the display's layout, with any bits beyond
+        # its width or height clear, as they would be drawn
+        buf = bytearray(self._size(width, height))
+        framebuf.FrameBuffer(buf, width, height, self.format).blit(
+            framebuf.FrameBuffer(bitmap, width, height, format), 0, 0)
+        return buf
+
+    def sprite(self, bitmap, width, height, format=framebuf.MONO_VLSB, mode=OR,
+               mask=None, x=0, y=0):
+        """
+        makes a sprite of a bitmap (a buffer of width x height pixels in the
+        FrameBuffer format given) drawn in mode OR, XOR or MASK (with a mask
+        in the same format), placed at (x, y) at the next update()
+        """
+        data = self._native(bitmap, width, height, format)
+        if mode == MASK:
+            mask = self._native(mask, width, height, format)
+            # pixels outside the mask are not drawn
+            data = bytearray(data[i] & mask[i] for i in range(len(mask)))
+        else:
+            mask = None
+        sprite = Sprite(self, data, mask, width, height, mode, x, y)
+        self.sprites.append(sprite)
+        return sprite
+
+    def remove(self, sprite):
+        # takes a sprite off the display and out of the layer
+        sprite.show(False)
+        self.update()
+        self.sprites.remove(sprite)
+
+    def erase(self):
+        # takes all the sprites off the display, which update() redraws
+        for sprite in reversed(self.sprites):
+            if sprite._drawn is not None:
+                self._undraw(sprite)
+
+    def update(self):
+        """
+        redraws the sprites which have changed, and those overlapping them,
+        so that the display's next show() sends only their old and new areas
+        """
+        sprites = self.sprites
+        redraw = [s._changed() for s in sprites]
+        grown = True
+        while grown:
+            grown = False
+            for i in range(len(sprites)):
+                if not redraw[i]:
+                    for j in range(len(sprites)):
+                        if redraw[j] and sprites[i]._overlaps(sprites[j]):
+                            redraw[i] = grown = True
+                            break
+        # sprites are taken off in the reverse order to that they were drawn
+        # in, so that each restores what was under it
+        for i in range(len(sprites) - 1, -1, -1):
+            if redraw[i] and sprites[i]._drawn is not None:
+                self._undraw(sprites[i])
+        for i in range(len(sprites)):
+            if redraw[i] and sprites[i].visible:
+                self._draw(sprites[i])
+
+    def _undraw(self, sprite):
+        (x, y) = sprite._drawn
+        if sprite.mode == XOR:
+            self._bits(sprite._data, sprite, x, y, 2)
+        else:
+            self.display.blit(sprite._under, x, y)
+        sprite._drawn = None
+
+    def _draw(self, sprite):
+        (x, y) = (sprite.x, sprite.y)
+        if sprite.mode == XOR:
+            self._bits(sprite._data, sprite, x, y, 2)
+        else:
+            sprite._under.blit(self.display, -x, -y)
+            if sprite.mode == MASK:
+                self._bits(sprite._mask, sprite, x, y, 0)
+            self._bits(sprite._data, sprite, x, y, 1)
+        sprite._drawn = (x, y)
+
+    def _bits(self, bitmap, sprite, x, y, op):
+        # clears (op 0), ORs (1) or XORs (2) a bitmap into the framebuffer
+        d = self.display
+        (w, h) = (sprite.width, sprite.height)
+        if self.vlsb:
+            _draw_bits(d.displaybuf, bitmap, 0, w, (h + 7) >> 3, 1,
+                       d.width, d.pages, x, y, op)
+        else:
+            _draw_bits(d.displaybuf, bitmap, 0, h, (w + 7) >> 3, 0,
+                       d.height, d.width >> 3, y, x, op)
+        d.register_updates(y, y + h - 1, x, x + w - 1)
@@ -0,0 +1,147 @@
+# Converts a BDF bitmap font into the font data read by sh1107_font.Font
+#
+# The glyphs are packed in the layout of the display's framebuffer, MONO_VLSB
+# (the default) for displays used at 90 or 270 degrees or MONO_HMSB for 0 or
+# 180 degrees, so that they can be drawn without converting them. Each glyph
+# is as wide as its advance (DWIDTH) and as high as the font (ascent plus
+# descent); pixels outside this cell are dropped.
+#
+# usage:
+#   python tools/bdf2font.py font.bdf helv12.py [--layout hmsb]
+#                            [--first 32] [--last 126]
+#
+# A .py output is a module with the font data as a bytes constant FONT, which
+# can be frozen into the firmware and is then read from flash:
+#   from helv12 import FONT
+#   font = sh1107_font.Font(FONT)
+# Any other output file name gets the font data as a binary file, which can
+# be read into RAM with Font(open("helv12.bin", "rb").read()).
+
+import os
+import sys
+
+_FONT_MARKER = 0x66
+VLSB = 0
+HMSB = 1
+
+
+def read_bdf(path):
+    # returns (ascent, descent, glyphs), glyphs mapping each character code
+    # to (advance, x offset, y offset, width, height, rows), where rows are the
+    # bitmap rows from the top as ints with the leftmost pixel as the top bit
+    ascent = descent = None
+    glyphs = {}
+    with open(path) as f:
+        lines = iter(f.read().splitlines())
+    for line in lines:
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == "FONT_ASCENT":
+            ascent = int(words[1])
+        elif words[0] == "FONT_DESCENT":
+            descent = int(words[1])
+        elif words[0] == "FONTBOUNDINGBOX" and ascent is None:
+            (height, yoff) = (int(words[2]), int(words[4]))
+            (ascent, descent) = (height + yoff, -yoff)
+        elif words[0] == "STARTCHAR":
+            code = advance = bbx = None
+            for line in lines:
+                words = line.split()
+                if words[0] == "ENCODING":
+                    code = int(words[-1])
+                elif words[0] == "DWIDTH":
+                    advance = int(words[1])
+                elif words[0] == "BBX":
+                    bbx = [int(v) for v in words[1:5]]
+                elif words[0] == "BITMAP":
+                    rows = []
+                    for line in lines:
+                        if line.strip() == "ENDCHAR":
+                            break
+                        row = int(line.strip(), 16)
+                        # the hex digits are padded to whole bytes
+                        rows.append(row >> (len(line.strip()) * 4 - bbx[0]))
+                    break
+            if code is not None and code >= 0 and bbx is not None:
+                glyphs[code] = (advance if advance is not None else bbx[0],
+                                bbx[2], bbx[3], bbx[0], bbx[1], rows)
+    if ascent is None or descent is None:
+        raise ValueError("%s: no font ascent and descent" % path)
+    return ascent, descent, glyphs
+
+
+def cell(glyph, ascent, height):
+    # the set pixels of a glyph as (x, y) in its advance x height cell
+    (advance, xoff, yoff, w, h, rows) = glyph
+    top = ascent - yoff - h
+    for (j, row) in enumerate(rows):
+        for i in range(w):
+            if row >> (w - 1 - i) & 1:
+                (x, y) = (xoff + i, top + j)
+                if 0 <= x < advance and 0 <= y < height:
+                    yield (x, y)
+
+
+def pack(glyph, ascent, height, layout):
+    # a glyph as a MONO_VLSB or MONO_HMSB framebuffer of its advance x height
+    advance = glyph[0]
+    if layout == VLSB:
+        buf = bytearray(advance * ((height + 7) // 8))
+        for (x, y) in cell(glyph, ascent, height):
+            buf[(y >> 3) * advance + x] |= 1 << (y & 7)
+    else:
+        row_bytes = (advance + 7) // 8
+        buf = bytearray(height * row_bytes)
+        for (x, y) in cell(glyph, ascent, height):
+            buf[y * row_bytes + (x >> 3)] |= 1 << (x & 7)
+    return buf
+
+
+def convert(path, layout=VLSB, first=32, last=126):
+    # the font data for the characters first to last of a BDF font
+    (ascent, descent, glyphs) = read_bdf(path)
+    height = ascent + descent
+    if not 0 < height < 256:
+        raise ValueError("%s: font height %d not supported" % (path, height))
+    table = bytearray()
+    data = bytearray()
+    for code in range(first, last + 1):
+        glyph = glyphs.get(code)
+        if glyph is None or not 0 < glyph[0] < 256:
+            table += bytes(3)
+            continue
+        if len(data) > 0xFFFF:
+            raise ValueError("%s: too much glyph data, use fewer characters" % path)
+        table += bytes((len(data) & 0xFF, len(data) >> 8, glyph[0]))
+        data += pack(glyph, ascent, height, layout)
+    header = bytes((_FONT_MARKER, layout, height, ascent, first, last))
+    return header + table + data
+
+
+def write_module(font, out, source):
+    out.write("# font data for sh1107_font.Font, made by tools/bdf2font.py from %s\n"
+              % os.path.basename(source))
+    out.write("FONT = (\n")
+    for i in range(0, len(font), 16):
+        out.write('    b"%s"\n' % "".join("\\x%02x" % b for b in font[i:i + 16]))
+    out.write(")\n")
+
+
+def _main(argv):
+    (source, output) = argv[:2]
+    args = dict(zip(argv[2::2], argv[3::2]))
+    layout = {"vlsb": VLSB, "hmsb": HMSB}[args.get("--layout", "vlsb")]
+    font = convert(source, layout, int(args.get("--first", 32)),
+                   int(args.get("--last", 126)))
+    if output.endswith(".py"):
+        with open(output, "w") as out:
+            write_module(font, out, source)
+    else:
+        with open(output, "wb") as out:
+            out.write(font)
+    print("%s: %d bytes" % (output, len(font)))
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -0,0 +1,360 @@
+# Benchmarks for the SH1107 driver under CPython
+#
+# Replays drawing workloads through the driver against a bus which counts
+# transactions, bytes and GPIO pin changes, and estimates the time these
+# take on the wire with a cost model for each connection. For every workload,
+# connection and rotation the report gives the estimated bus limited frame
+# rate, the bytes and transactions per frame, and the Python time spent in
+# show() and register_updates() (on the host computer, so only useful to
+# compare versions of the driver), and the memory kept per frame, which
+# should be 0 once the memoryviews of the updated areas have been made.
+#
+# usage:
+#   python tools/bench.py [--size 128x64] [--frames 20] [--workload text]
+#                         [--model i2c-400k] [--rotate 90] [--check-heap]
+#                         [--framebuf2]
+#
+# --framebuf2 runs the driver as loaded with framebuf2 (see
+# host.extended_sh1107()), so that the large_text workload draws its digits
+# from the glyph cache.
+#
+# --check-heap runs each workload, with and without a shadow buffer, with a
+# contrast() call per frame, and exits with status 1 if after warming up the
+# driver keeps any memory or hands the bus any buffer made for the update
+# (such as a memoryview of a span).
+#
+# The cost models are estimates, not measurements; edit COST_MODELS or add a
+# model to compare with timings from a device.
+
+import os
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+import host
+import sh1107
+
+# bus:            "i2c" or "spi"
+# hz:             bus clock frequency
+# bits_per_byte:  bit times per byte (9 for I2C with the acknowledge bit)
+# framing_bits:   bit times per transaction besides its bytes (I2C start,
+#                 address byte and acknowledge, stop)
+# transaction_us: software overhead of one bus write call
+# toggle_us:      cost of one GPIO pin change (SPI DC and CS)
+CostModel = namedtuple("CostModel",
+                       "name bus hz bits_per_byte framing_bits transaction_us toggle_us")
+
+COST_MODELS = (
+    CostModel("i2c-400k", "i2c", 400_000, 9, 11, 30, 0),
+    CostModel("i2c-1M", "i2c", 1_000_000, 9, 11, 30, 0),
+    CostModel("spi-10M", "spi", 10_000_000, 8, 0, 10, 3),
+    CostModel("spi-40M", "spi", 40_000_000, 8, 0, 10, 3),
+)
+
+
+def _track(port, buf):
+    # counts buf if it was made while tracemalloc is tracing, that is for
+    # the update being measured
+    if tracemalloc.get_object_traceback(buf) is not None:
+        port.new_buffers += 1
+
+
+class CostI2C:
+    # stands in for machine.I2C, counting transactions and bytes, and with
+    # track the buffers (and writevto() lists) made while tracing
+    def __init__(self, track=False):
+        self.transactions = 0
+        self.nbytes = 0
+        self.track = track
+        self.new_buffers = 0
+
+    def writeto(self, address, buf, stop=True):
+        self.transactions += 1
+        self.nbytes += len(buf)
+        if self.track:
+            _track(self, buf)
+
+    def writevto(self, address, vector, stop=True):
+        self.transactions += 1
+        for buf in vector:
+            self.nbytes += len(buf)
+        if self.track:
+            _track(self, vector)
+            for buf in vector:
+                _track(self, buf)
+
+
+class CostSPI:
+    # stands in for machine.SPI, counting writes and bytes, and with track
+    # the buffers made while tracing
+    def __init__(self, track=False):
+        self.transactions = 0
+        self.nbytes = 0
+        self.dc = host.RecordingPin(0)
+        self.cs = host.RecordingPin(1)
+        self.track = track
+        self.new_buffers = 0
+
+    def write(self, buf):
+        self.transactions += 1
+        self.nbytes += len(buf)
+        if self.track:
+            _track(self, buf)
+
+
+def bench_display(bus, width, height, rotate=0, track=False, driver=sh1107, **kwargs):
+    # a display on a counting bus (which, unlike the recording buses, keeps
+    # no log, so memory use can be measured), made by the driver module
+    # (sh1107 or host.extended_sh1107())
+    if bus == "i2c":
+        port = CostI2C(track)
+        return driver.SH1107_I2C(width, height, port, rotate=rotate, **kwargs), port
+    port = CostSPI(track)
+    return driver.SH1107_SPI(width, height, port, port.dc, None, port.cs,
+                             rotate=rotate, **kwargs), port
+
+
+def bus_time_us(model, transactions, nbytes, toggles):
+    bits = nbytes * model.bits_per_byte + transactions * model.framing_bits
+    return (bits * 1_000_000 / model.hz + transactions * model.transaction_us
+            + toggles * model.toggle_us)
+
+
+# workloads: (name, setup(display), frame(display, i)); each frame draws
+# and the benchmark calls show() after it
+
+def _animation_setup(d):
+    pass
+
+def _animation_frame(d, i):
+    # a filled square and a circle bouncing across the whole screen
+    d.fill(0)
+    x = (i * 5) % (d.width - 24)
+    y = (i * 3) % (d.height - 24)
+    d.fill_rect(x, y, 24, 24, 1)
+    d.ellipse(d.width - 1 - x - 12, y + 12, 12, 12, 1)
+    d.text("frame %d" % (i % 100), 0, d.height - 8, 1)
+
+def _text_setup(d):
+    d.text("SH1107 driver", 0, 0, 1)
+    d.rect(0, 12, d.width, d.height - 12, 1)
+
+def _text_frame(d, i):
+    # one line of text changing, as in the contrast demo
+    d.fill_rect(8, 24, 96, 8, 0)
+    d.text("count %d" % i, 8, 24, 1)
+
+def _clock_setup(d):
+    d.text("12:3", 0, 0, 1)
+
+def _clock_frame(d, i):
+    # a single 8x8 digit changing
+    d.fill_rect(32, 0, 8, 8, 0)
+    d.text(str(i % 10), 32, 0, 1)
+
+def _log_setup(d):
+    pass
+
+def _log_frame(d, i):
+    # a scrolling text log: scroll up by a line, write a new bottom line
+    d.scroll(0, -8)
+    d.fill_rect(0, d.height - 8, d.width, 8, 0)
+    d.text("log line %d" % i, 0, d.height - 8, 1)
+
+def _large_text_setup(d):
+    # with framebuf2 the digits are drawn from the glyph cache
+    if hasattr(d, "glyph_cache"):
+        d.glyph_cache()
+
+def _large_text_frame(d, i):
+    # a 4x scaled digit, as in the demo; without framebuf2 the large_text()
+    # of the framebuf stand-in draws it as framebuf2 does, with a fill_rect()
+    # per pixel
+    d.fill_rect(0, 0, 32, 32, 0)
+    d.large_text(str(i % 10), 0, 0, 4, 1)
+
+def _sprite_setup(d):
+    d.text("sprite", 0, 0, 1)
+
+_SPRITE = (bytearray(b"\x3c\x7e\xff\xdb\xff\xff\x7e\x3c"), 8, 8, sh1107.framebuf.MONO_VLSB)
+
+def _sprite_frame(d, i):
+    # an 8x8 sprite moving diagonally, erasing its last position
+    w, h = d.width - 8, d.height - 16
+    (x, y) = ((i - 1) * 3 % w, 16 + (i - 1) * 2 % h)
+    d.fill_rect(x, y, 8, 8, 0)
+    (x, y) = (i * 3 % w, 16 + i * 2 % h)
+    d.blit(_SPRITE, x, y)
+
+def _sprite_layer_setup(d):
+    import sh1107_sprites
+    d.text("sprites", 0, 0, 1)
+    d.rect(0, 12, d.width, d.height - 12, 1)
+    layer = sh1107_sprites.SpriteLayer(d)
+    layer.sprite(_SPRITE[0], 8, 8)
+    layer.sprite(_SPRITE[0], 8, 8, mode=sh1107_sprites.XOR)
+    layer.sprite(bytearray(b"\xff" * 32), 16, 16, mode=sh1107_sprites.MASK,
+                 mask=bytearray(b"\x18\x3c\x7e\xff" * 8))
+    d.bench_layer = layer
+
+def _sprite_layer_frame(d, i):
+    # three sprites moving over a background, with save-under
+    (w, h) = (d.width - 16, d.height - 32)
+    for (k, sprite) in enumerate(d.bench_layer.sprites):
+        sprite.move((i + 20 * k) * 3 % w, 16 + (i * 2 + 10 * k) % h)
+    d.bench_layer.update()
+
+WORKLOADS = (
+    ("animation", _animation_setup, _animation_frame),
+    ("text line", _text_setup, _text_frame),
+    ("clock digit", _clock_setup, _clock_frame),
+    ("scrolling log", _log_setup, _log_frame),
+    ("large_text", _large_text_setup, _large_text_frame),
+    ("sprite", _sprite_setup, _sprite_frame),
+    ("sprite layer", _sprite_layer_setup, _sprite_layer_frame),
+)
+
+Result = namedtuple("Result",
+                    "workload model rotate fps bytes transactions show_us register_us growth")
+
+
+def run(workload, model, width=128, height=128, rotate=0, frames=20, **kwargs):
+    # runs a workload, returning per frame averages as a Result
+    (name, setup, frame) = workload
+    display, port = bench_display(model.bus, width, height, rotate, **kwargs)
+    # time spent in register_updates() is measured through an instance
+    # attribute, which the drawing methods call instead of the method
+    register_updates = display.register_updates
+    timing = [0]
+    def timed_register_updates(*args):
+        t = time.perf_counter_ns()
+        register_updates(*args)
+        timing[0] += time.perf_counter_ns() - t
+    display.register_updates = timed_register_updates
+    setup(display)
+    display.show()
+    # some frames first, so that kept memoryviews (and the glyphs of the
+    # large_text workload) are made
+    for i in range(10):
+        frame(display, i)
+        display.show()
+    pins = (port.dc, port.cs) if model.bus == "spi" else ()
+    (transactions, nbytes) = (port.transactions, port.nbytes)
+    toggles = sum(p.toggles for p in pins)
+    show_ns = 0
+    timing[0] = 0
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(10, 10 + frames):
+        frame(display, i)
+        t = time.perf_counter_ns()
+        display.show()
+        show_ns += time.perf_counter_ns() - t
+    growth = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    transactions = port.transactions - transactions
+    nbytes = port.nbytes - nbytes
+    toggles = sum(p.toggles for p in pins) - toggles
+    frame_us = bus_time_us(model, transactions, nbytes, toggles) / frames
+    return Result(name, model.name, rotate,
+                  1_000_000 / frame_us if frame_us else float("inf"),
+                  nbytes / frames, transactions / frames,
+                  show_ns / frames / 1000, timing[0] / frames / 1000,
+                  growth / frames)
+
+
+def heap_check(workload, model, width=128, height=128, rotate=0, frames=30,
+               warmup=50, shadow=False, **kwargs):
+    # the memory kept by the driver and the number of buffers made and given
+    # to the bus over frames, after warmup frames, each drawn and shown with
+    # a contrast() call; only memory allocated in the driver's modules is
+    # counted, not that of the counting bus. A buffer made for an update (a
+    # memoryview of a span, say) is counted even if it is freed again, which
+    # the memory kept does not show
+    (name, setup, frame) = workload
+    display, port = bench_display(model.bus, width, height, rotate, True, **kwargs)
+    if shadow:
+        display.shadow_buffer()
+    setup(display)
+    display.show()
+    for i in range(warmup):
+        frame(display, i)
+        display.show()
+        display.contrast(i & 0xFF)
+    driver = [tracemalloc.Filter(True, os.path.join(
+        os.path.dirname(os.path.abspath(sh1107.__file__)), "sh1107*.py"))]
+    new_buffers = port.new_buffers
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot().filter_traces(driver)
+    for i in range(warmup, warmup + frames):
+        frame(display, i)
+        display.show()
+        display.contrast(i & 0xFF)
+    after = tracemalloc.take_snapshot().filter_traces(driver)
+    tracemalloc.stop()
+    return (sum(s.size_diff for s in after.compare_to(before, "filename")),
+            port.new_buffers - new_buffers)
+
+
+def check_heap(width=128, height=128, frames=30, workloads=WORKLOADS,
+               models=COST_MODELS, rotations=(0, 90, 180, 270), out=sys.stdout, **kwargs):
+    # runs heap_check() for the workloads on each bus (the cost models of a
+    # bus send the same), with and without a shadow buffer, returning
+    # whether the driver kept no memory and made no buffers in any of them
+    ok = True
+    buses = {}
+    for model in models:
+        buses.setdefault(model.bus, model)
+    for workload in workloads:
+        for model in buses.values():
+            for rotate in rotations:
+                for shadow in (False, True):
+                    (kept, made) = heap_check(workload, model, width, height, rotate,
+                                              frames, shadow=shadow, **kwargs)
+                    if kept or made:
+                        ok = False
+                        out.write("%s, %s, rotate %d%s: %d bytes kept and %d buffers made"
+                                  " over %d frames\n" % (
+                                      workload[0], model.bus, rotate,
+                                      ", shadow buffer" if shadow else "", kept, made, frames))
+    out.write("heap check %s\n" % ("ok" if ok else "failed"))
+    return ok
+
+
+def report(width=128, height=128, frames=20, workloads=WORKLOADS,
+           models=COST_MODELS, rotations=(0, 90, 180, 270), out=sys.stdout, **kwargs):
+    out.write("%dx%d, %d frames per run\n" % (width, height, frames))
+    out.write("%-14s %-9s %3s %8s %8s %6s %9s %9s %7s\n" % (
+        "workload", "bus", "rot", "fps", "bytes", "trans", "show us",
+        "reg us", "growth"))
+    results = []
+    for workload in workloads:
+        for model in models:
+            for rotate in rotations:
+                r = run(workload, model, width, height, rotate, frames, **kwargs)
+                results.append(r)
+                out.write("%-14s %-9s %3d %8.1f %8.0f %6.1f %9.1f %9.1f %7.0f\n" % r)
+    return results
+
+
+def _main(argv):
+    check = "--check-heap" in argv
+    driver = host.extended_sh1107() if "--framebuf2" in argv else sh1107
+    argv = [a for a in argv if a not in ("--check-heap", "--framebuf2")]
+    args = dict(zip(argv[::2], argv[1::2]))
+    (width, height) = (int(v) for v in args.get("--size", "128x128").split("x"))
+    workloads = [w for w in WORKLOADS if args.get("--workload", w[0]) == w[0]]
+    models = [m for m in COST_MODELS if args.get("--model", m.name) == m.name]
+    rotations = [r for r in (0, 90, 180, 270) if int(args.get("--rotate", r)) == r]
+    if check:
+        if not check_heap(width, height, int(args.get("--frames", 30)), workloads,
+                          models, rotations, driver=driver):
+            sys.exit(1)
+        return
+    report(width, height, int(args.get("--frames", 20)), workloads, models, rotations,
+           driver=driver)
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
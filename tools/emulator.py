@@ -0,0 +1,520 @@
+# SH1107 controller emulator for running the driver headless under CPython
+#
+# The emulator takes the command and data stream sent by the driver (through
+# the recording buses of host.py), keeps the 128x128 display RAM and the
+# display registers, and renders what the panel shows, so that changes to
+# show(), flip() and display_start_line() can be checked pixel by pixel
+# against the framebuffer.
+#
+# usage:
+#   python tools/emulator.py        checks every size, connection and rotation,
+#                                   with and without the combined or burst
+#                                   option and a shadow buffer, with a sequence
+#                                   of updates, random drawing, show_async()
+#                                   and viewports, and the glyph cache of
+#                                   large_text() against framebuf2
+#
+#   import emulator
+#   display, emu = emulator.emulated_display("i2c", 128, 128, rotate=90)
+#   display.text("SH1107", 0, 0, 1)
+#   display.show()
+#   emu.save_pbm("screen.pbm")
+#   assert emulator.mismatches(display, emu) == 0
+#
+# Panel model: the panel has mux + 1 COM lines (rows) and 128 SEG lines
+# (columns). Row r shows RAM row (com + start line + display offset) & 127,
+# where com is r, or mux - r when the scan direction is reversed (C8h), and
+# column s shows RAM column s, or 127 - s when the segments are re-mapped
+# (A1h). For 128x128 panels this gives the upright picture for each rotation
+# (see panel_mismatches()). How the 64 pixel side of a 128x64 panel is wired
+# to the SEG and COM lines is not modelled, so for that size render() shows
+# the full 128 columns and the checks compare the display RAM only.
+
+import struct
+import sys
+import zlib
+from array import array
+
+import host
+
+# commands followed by a second (argument) byte
+_DOUBLE_BYTE = (0x81, 0xA8, 0xAD, 0xD3, 0xD5, 0xD9, 0xDB, 0xDC)
+
+
+class SH1107Emulator:
+
+    def __init__(self):
+        self.ram = bytearray(16 * 128)
+        self.page = 0
+        self.column = 0
+        self.vertical = False
+        self.start_line = 0
+        self.offset = 0
+        self.remap = 0
+        self.reverse_scan = 0
+        self.inverse = 0
+        self.contrast = 0x80
+        self.mux = 127
+        self.entire_on = 0
+        self.on = False
+        self.commands = 0
+        self.data_bytes = 0
+        self._pending = None
+
+    def listener(self, is_data, buf):
+        # receives the command and data runs from a recording bus
+        if is_data:
+            self.data(buf)
+        else:
+            self.command(buf)
+
+    def command(self, buf):
+        for b in buf:
+            self.commands += 1
+            if self._pending is not None:
+                op = self._pending
+                self._pending = None
+                if op == 0x81:
+                    self.contrast = b
+                elif op == 0xA8:
+                    self.mux = b & 0x7F
+                elif op == 0xD3:
+                    self.offset = b & 0x7F
+                elif op == 0xDC:
+                    self.start_line = b & 0x7F
+                # DC-DC, clock divider, pre-charge and VCOM levels do not
+                # change the picture
+                continue
+            if b in _DOUBLE_BYTE:
+                self._pending = b
+            elif b < 0x10:
+                self.column = (self.column & 0x70) | b
+            elif b < 0x18:
+                self.column = (self.column & 0x0F) | ((b & 0x07) << 4)
+            elif b in (0x20, 0x21):
+                self.vertical = b == 0x21
+            elif b in (0xA0, 0xA1):
+                self.remap = b & 1
+            elif b in (0xA4, 0xA5):
+                self.entire_on = b & 1
+            elif b in (0xA6, 0xA7):
+                self.inverse = b & 1
+            elif b in (0xAE, 0xAF):
+                self.on = bool(b & 1)
+            elif 0xB0 <= b <= 0xBF:
+                self.page = b & 0x0F
+            elif 0xC0 <= b <= 0xCF:
+                self.reverse_scan = (b >> 3) & 1
+            elif b == 0xE3:  # nop
+                pass
+            else:
+                raise ValueError("unknown SH1107 command 0x%02x" % b)
+
+    def data(self, buf):
+        ram = self.ram
+        for b in buf:
+            self.data_bytes += 1
+            ram[self.page * 128 + self.column] = b
+            if self.vertical:
+                # the page address increments, and wraps to the next column
+                self.page += 1
+                if self.page == 16:
+                    self.page = 0
+                    self.column = (self.column + 1) & 0x7F
+            else:
+                self.column = (self.column + 1) & 0x7F
+
+    def ram_pixel(self, row, column):
+        return self.ram[(row >> 3) * 128 + column] >> (row & 7) & 1
+
+    def render(self):
+        # the panel picture as mux + 1 rows of 128 values (0 or 1)
+        rows = []
+        for r in range(self.mux + 1):
+            com = self.mux - r if self.reverse_scan else r
+            ram_row = (com + self.start_line + self.offset) & 127
+            line = bytearray(128)
+            if self.on:
+                for s in range(128):
+                    if self.entire_on:
+                        line[s] = 1
+                    else:
+                        column = 127 - s if self.remap else s
+                        line[s] = self.ram_pixel(ram_row, column) ^ self.inverse
+            rows.append(line)
+        return rows
+
+    def to_numpy(self):
+        import numpy
+        return numpy.array(self.render(), dtype=numpy.uint8)
+
+    def save_pbm(self, path):
+        rows = self.render()
+        with open(path, "wb") as f:
+            f.write(b"P4\n%d %d\n" % (128, len(rows)))
+            for line in rows:
+                f.write(_pack_bits(line))
+
+    def save_png(self, path, scale=2):
+        # a 1 bit greyscale PNG, lit pixels white
+        rows = self.render()
+        raw = bytearray()
+        for line in rows:
+            line = bytes(v for v in line for _ in range(scale))
+            packed = bytes(~b & 0xFF for b in _pack_bits(line))
+            for _ in range(scale):
+                raw += b"\x00" + packed
+        width, height = 128 * scale, len(rows) * scale
+        with open(path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+            f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 1, 0, 0, 0, 0)))
+            f.write(_png_chunk(b"IDAT", zlib.compress(bytes(raw))))
+            f.write(_png_chunk(b"IEND", b""))
+
+
+def _pack_bits(line):
+    # 0/1 values to bytes, most significant bit first, 1 = black (as PBM)
+    out = bytearray((len(line) + 7) // 8)
+    for i, v in enumerate(line):
+        if v:
+            out[i >> 3] |= 0x80 >> (i & 7)
+    return out
+
+
+def _png_chunk(kind, data):
+    return (struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+
+def emulated_display(bus, width, height, rotate=0, shadow=False, **kwargs):
+    # a display on a recording bus connected to an emulator, with a shadow
+    # buffer if shadow is True
+    emu = SH1107Emulator()
+    display = host.recording_display(bus, width, height, rotate,
+                                     listener=emu.listener, **kwargs)
+    if shadow:
+        display.shadow_buffer()
+    return display, emu
+
+
+def ram_position(display, x, y):
+    # the RAM row and column the driver writes framebuffer pixel (x, y) to
+    # (the lines along the COM axis are moved by hardware scrolling)
+    if display.rotate90:
+        return ((y + display._scroll) & 127, x)
+    return ((x + display._scroll) & 127, y)
+
+
+def mismatches(display, emu):
+    # the number of framebuffer pixels that differ from the display RAM
+    bad = 0
+    for y in range(display.height):
+        for x in range(display.width):
+            (row, column) = ram_position(display, x, y)
+            if emu.ram_pixel(row, column) != display.pixel(x, y):
+                bad += 1
+    return bad
+
+
+def panel_position(display, emu, x, y):
+    # where framebuffer pixel (x, y) appears on the panel as (row, column)
+    # under the panel model, or None if it is outside the COM window
+    (row, column) = ram_position(display, x, y)
+    com = (row - emu.start_line - emu.offset) & 127
+    if com > emu.mux:
+        return None
+    r = emu.mux - com if emu.reverse_scan else com
+    s = 127 - column if emu.remap else column
+    return (r, s)
+
+
+# the panel position (row, column) of framebuffer pixel (x, y) of a 128x128
+# display for each rotation, not flipped and with the display start line at 0
+_ORIENTATION = {
+    0: lambda x, y: (x, 127 - y),
+    90: lambda x, y: (y, x),
+    180: lambda x, y: (127 - x, y),
+    270: lambda x, y: (127 - y, 127 - x),
+}
+
+
+def panel_mismatches(display, emu):
+    # the number of pixels of the rendered panel of a 128x128 display that
+    # differ from the framebuffer turned to the display rotation (and by a
+    # further 180 degrees when flipped) and scrolled by display_start_line()
+    rows = emu.render()
+    place = _ORIENTATION[display.rotate]
+    scroll = (emu.start_line - display._scroll) & 127
+    scroll = -scroll if emu.reverse_scan else scroll
+    bad = 0
+    for y in range(128):
+        for x in range(128):
+            (r, s) = place(x, y)
+            if display.flip_flag:
+                (r, s) = (127 - r, 127 - s)
+            lit = display.pixel(x, y) ^ emu.inverse if emu.on else 0
+            if rows[(r - scroll) & 127][s] != lit:
+                bad += 1
+    return bad
+
+
+def check(bus, width, height, rotate, out=sys.stdout, **kwargs):
+    # draws, updates and flips a display and checks the display RAM against
+    # the framebuffer after each step, returns the number of failures
+    display, emu = emulated_display(bus, width, height, rotate, **kwargs)
+    steps = (
+        ("text", lambda d: (d.text("SH1107", 3, 5, 1), d.show())),
+        ("rect", lambda d: (d.fill_rect(10, 20, 30, 17, 1), d.show())),
+        ("line", lambda d: (d.line(0, d.height - 1, d.width - 1, 0, 1), d.show())),
+        ("pixel", lambda d: (d.pixel(d.width - 1, d.height - 1, 1), d.show())),
+        ("clear", lambda d: (d.fill_rect(12, 22, 5, 5, 0), d.show())),
+        ("flip", lambda d: d.flip(True)),
+        ("draw flipped", lambda d: (d.hline(0, 40, d.width, 1), d.show())),
+        ("unflip", lambda d: d.flip(False)),
+        ("invert", lambda d: d.invert(1)),
+        ("start line", lambda d: d.display_start_line(24)),
+        ("scroll", lambda d: (d.scroll(*((0, 5) if d.rotate90 else (5, 0))), d.show())),
+        ("scroll back", lambda d: (d.scroll(*((0, -13) if d.rotate90 else (-13, 0))), d.show())),
+        ("draw scrolled", lambda d: (d.text("SH1107", 3, 30, 1), d.show())),
+        ("flip scrolled", lambda d: d.flip(True)),
+        ("full", lambda d: (d.flip(False), d.display_start_line(0), d.invert(0), d.show(True))),
+    )
+    failures = 0
+    for name, step in steps:
+        step(display)
+        bad = mismatches(display, emu)
+        if not bad and height == 128:
+            bad = panel_mismatches(display, emu)
+        if bad:
+            failures += 1
+            out.write("%dx%d %s rotate %d: %d pixels wrong after %s\n"
+                      % (width, height, bus, rotate, bad, name))
+    return failures
+
+
+class _Sprite(host.sh1107.framebuf.FrameBuffer):
+    # a FrameBuffer source with width and height attributes, which blit()
+    # uses as the size of the update
+    def __init__(self, width, height):
+        super().__init__(bytearray(width * ((height + 7) // 8)), width, height,
+                         host.sh1107.framebuf.MONO_VLSB)
+        (self.width, self.height) = (width, height)
+
+
+def _random_drawing(d, rnd):
+    # one random drawing operation, partly off the screen at times
+    (x, y) = (rnd.randrange(-20, d.width + 4), rnd.randrange(-20, d.height + 4))
+    (w, h, c) = (rnd.randrange(1, 40), rnd.randrange(1, 40), rnd.randrange(2))
+    k = rnd.randrange(10)
+    if k == 0:
+        d.pixel(x, y, c)
+    elif k == 1:
+        d.line(x, y, rnd.randrange(-10, d.width + 10), rnd.randrange(-10, d.height + 10), c)
+    elif k == 2:
+        d.rect(x, y, w, h, c, rnd.randrange(2))
+    elif k == 3:
+        d.text("SH%d" % w, x, y, c)
+    elif k == 4:
+        d.ellipse(x, y, w // 2, h // 2, c, rnd.randrange(2), rnd.randrange(16))
+    elif k == 5:
+        coords = array("h", [rnd.randrange(-12, 30) for _ in range(2 * rnd.randrange(1, 5))])
+        d.poly(x, y, coords, c, rnd.randrange(2))
+    elif k == 6:
+        sprite = bytearray(rnd.randrange(256) for _ in range(w * ((h + 7) // 8)))
+        d.blit((sprite, w, h, host.sh1107.framebuf.MONO_VLSB), x, y, rnd.choice((-1, 0, 1)))
+    elif k == 7:
+        sprite = _Sprite(w, h)
+        sprite.fill_rect(1, 1, w - 2, h - 2, 1)
+        d.blit(sprite, x, y, 0)
+    elif k == 8:
+        d.scroll(rnd.randrange(-12, 13), rnd.randrange(-12, 13))
+    else:
+        d.hline(x, y, w, c)
+        d.vline(x, y, h, c)
+
+
+def fuzz(bus, width, height, rotate, steps=50, seed=0, out=sys.stdout, **kwargs):
+    # random drawing with an update after each step or two; any pixel changed
+    # but not registered for update differs from the display RAM afterwards.
+    # Returns the number of failures
+    import random
+    rnd = random.Random(seed)
+    display, emu = emulated_display(bus, width, height, rotate, **kwargs)
+    for step in range(steps):
+        for _ in range(rnd.randrange(1, 4)):
+            _random_drawing(display, rnd)
+        if rnd.randrange(4):
+            display.show()
+            bad = mismatches(display, emu)
+            if bad:
+                out.write("%dx%d %s rotate %d: %d pixels not updated at step %d (seed %d)\n"
+                          % (width, height, bus, rotate, bad, step, seed))
+                return 1
+    return 0
+
+
+def async_fuzz(bus, width, height, rotate, steps=20, seed=0, out=sys.stdout, **kwargs):
+    # random drawing in a task which yields between drawing operations, while
+    # show_async() sends an update with random budget and frame_ms arguments;
+    # after each step a further show_async(), with the drawing finished,
+    # should leave the display RAM matching the framebuffer. Then a scroll
+    # along the COM axis is shown, with the panel checked between the
+    # batches of show_async(): once the display start line has moved, the
+    # panel should show the whole new picture. Returns the number of failures
+    import asyncio
+    import random
+    rnd = random.Random(seed)
+    display, emu = emulated_display(bus, width, height, rotate, **kwargs)
+    failures = []
+
+    def com_scroll():
+        # a scroll along the COM axis, made with the display start line
+        step = rnd.randrange(-12, 13)
+        display.scroll(*((0, step) if display.rotate90 else (step, 0)))
+
+    async def draw(operations):
+        for _ in range(operations):
+            if rnd.randrange(4):
+                _random_drawing(display, rnd)
+            else:
+                com_scroll()
+            await asyncio.sleep(0)
+
+    async def watch(start_line, done):
+        # runs between the batches of show_async()
+        while not done:
+            if emu.start_line != start_line:
+                bad = mismatches(display, emu)
+                if not bad and height == 128:
+                    bad = panel_mismatches(display, emu)
+                if bad:
+                    failures.append(bad)
+                    return
+                start_line = emu.start_line
+            await asyncio.sleep(0)
+
+    def failed(bad, what, step):
+        out.write("%dx%d %s rotate %d: %d pixels wrong %s at step %d (seed %d)\n"
+                  % (width, height, bus, rotate, bad, what, step, seed))
+        return 1
+
+    async def main():
+        for step in range(steps):
+            _random_drawing(display, rnd)
+            drawing = asyncio.create_task(draw(rnd.randrange(1, 6)))
+            await display.show_async(budget=rnd.choice((0, 0, 64, 300, 1000)),
+                                     frame_ms=rnd.choice((0, 0, 1)))
+            await drawing
+            await display.show_async()
+            bad = mismatches(display, emu)
+            if bad:
+                return failed(bad, "after show_async()", step)
+            com_scroll()
+            if rnd.randrange(2):
+                _random_drawing(display, rnd)
+            done = []
+            watching = asyncio.create_task(watch(emu.start_line, done))
+            await display.show_async(budget=rnd.choice((0, 0, 64, 300)),
+                                     frame_ms=rnd.choice((0, 0, 1)))
+            await display.show_async()
+            await asyncio.sleep(0)
+            done.append(True)
+            await watching
+            if failures:
+                return failed(failures[0], "on the panel during show_async() after a scroll", step)
+        return 0
+
+    return asyncio.run(main())
+
+
+def viewports(bus, width, height, rotate, steps=30, seed=0, out=sys.stdout, **kwargs):
+    # random drawing in viewports, among them one in the bottom right corner
+    # (whose framebuffer view runs to the end of the framebuffer), each sent
+    # on its own by flush(); returns the number of failures
+    import random
+    rnd = random.Random(seed)
+    display, emu = emulated_display(bus, width, height, rotate, **kwargs)
+    (w, h) = (display.width, display.height)
+    panes = (host.sh1107.Viewport(display, 0, 0, w // 2, h // 2),
+             host.sh1107.Viewport(display, w // 2, h // 2, w - w // 2, h - h // 2),
+             host.sh1107.Viewport(display, w - 8, h - 8, 8, 8))
+    for step in range(steps):
+        pane = rnd.choice(panes)
+        _random_drawing(pane, rnd)
+        pane.flush()
+        bad = mismatches(display, emu)
+        if bad:
+            out.write("%dx%d %s rotate %d: %d pixels wrong after viewport flush at step %d\n"
+                      % (width, height, bus, rotate, bad, step))
+            return 1
+    return 0
+
+
+def glyphs(bus, width, height, rotate, out=sys.stdout, **kwargs):
+    # large_text() from the glyph cache against large_text() drawn by
+    # framebuf2 (the stand-in of framebuf.py, see host.extended_sh1107()),
+    # on a second display, for every argument the cache is used for: each
+    # scale, colour, text rotation and rotation of the characters (the
+    # argument after the text rotation, which the demos pass), at positions
+    # which clip the text. Returns the number of failures
+    import random
+    rnd = random.Random(rotate)
+    driver = host.extended_sh1107()
+    display, emu = emulated_display(bus, width, height, rotate, driver=driver, **kwargs)
+    drawn = host.recording_display(bus, width, height, rotate, driver=driver)
+    display.glyph_cache(8 * 16 * 16 * 2)
+    turns = driver._GLYPH_TURNS
+    for m in range(1, driver._GLYPH_SCALES + 1):
+        for r in turns:
+            for t in ((),) + tuple((t,) for t in (None,) + turns):
+                for c in (0, 1):
+                    size = 8 * m
+                    (x, y) = (rnd.randrange(-size // 2, display.width - size // 2),
+                              rnd.randrange(-size // 2, display.height - size // 2))
+                    for d in (display, drawn):
+                        d.fill(1 - c)
+                        d.line(0, 0, d.width - 1, d.height - 1, c)
+                        d.line(0, d.height - 1, d.width - 1, 0, 1 - c)
+                        d.large_text("AgA", x, y, m, c, r, *t)
+                    if display.displaybuf != drawn.displaybuf:
+                        out.write("%dx%d %s rotate %d: large_text() from the glyph cache"
+                                  " differs at scale %d, colour %d, rotation %d%s\n"
+                                  % (width, height, bus, rotate, m, c, r,
+                                     ", characters %s" % t[0] if t else ""))
+                        return 1
+        display.show()
+        bad = mismatches(display, emu)
+        if bad:
+            out.write("%dx%d %s rotate %d: %d pixels not updated after large_text()"
+                      " from the glyph cache at scale %d\n"
+                      % (width, height, bus, rotate, bad, m))
+            return 1
+    if not display.glyph_cache().hits:
+        out.write("%dx%d %s rotate %d: large_text() did not use the glyph cache\n"
+                  % (width, height, bus, rotate))
+        return 1
+    return 0
+
+
+# the ways of sending updates checked for each connection: the default,
+# with the combined (I2C) or burst (SPI) option, and with a shadow buffer
+_MODES = {
+    "i2c": ({}, {"combined": True}, {"shadow": True}),
+    "spi": ({}, {"burst": True}, {"shadow": True}),
+}
+
+if __name__ == "__main__":
+    failures = 0
+    for (width, height) in ((128, 128), (128, 64)):
+        for bus in ("i2c", "spi"):
+            for mode in _MODES[bus]:
+                for rotate in (0, 90, 180, 270):
+                    failures += check(bus, width, height, rotate, **mode)
+                    failures += fuzz(bus, width, height, rotate, seed=rotate, **mode)
+                    failures += async_fuzz(bus, width, height, rotate, seed=rotate, **mode)
+                    failures += viewports(bus, width, height, rotate, seed=rotate, **mode)
+                    if bus == "i2c" and not mode:
+                        # the glyphs drawn do not depend on the connection
+                        failures += glyphs(bus, width, height, rotate)
+    print("ok" if failures == 0 else "%d checks failed" % failures)
+    sys.exit(1 if failures else 0)
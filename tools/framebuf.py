@@ -0,0 +1,303 @@
+# CPython stand-in for the MicroPython framebuf module, for running
+# sh1107.py off-device (see host.py)
+# only the monochrome formats used by the driver are supported; text() uses
+# made up 8x8 glyphs with the same metrics as the MicroPython font, so
+# update areas and transfer sizes match those on a device; FrameBuffer also
+# has the large_text() of framebuf2, so the module can stand in for both
+
+MONO_VLSB = 0
+MVLSB = MONO_VLSB
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+
+
+def _glyph(ch):
+    # synthetic 8x8 glyph: 7x7 pattern derived from the character code,
+    # matching the metrics (not the shapes) of the MicroPython font
+    code = ord(ch)
+    if code < 32 or code > 127:
+        code = 127
+    if code == 32:
+        return bytes(8)
+    cols = bytearray(8)
+    seed = code * 2654435761 & 0xFFFFFFFF
+    for i in range(7):
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        cols[i] = ((seed >> 8) & 0x7F) | 0x01
+    return bytes(cols)
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        if format not in (MONO_VLSB, MONO_HLSB, MONO_HMSB):
+            raise ValueError("invalid format")
+        self._buf = buffer
+        self._w = width
+        self._h = height
+        self._fmt = format
+        self._stride = width if stride is None else stride
+        if format == MONO_VLSB:
+            need = (height + 7) // 8 * self._stride
+        else:
+            self._stride = (self._stride + 7) & ~7
+            need = height * self._stride // 8
+        if len(buffer) < need:
+            raise ValueError("buffer too small")
+
+    # pixel access
+    def _get(self, x, y):
+        if self._fmt == MONO_VLSB:
+            return (self._buf[(y >> 3) * self._stride + x] >> (y & 7)) & 1
+        index = (x + y * self._stride) >> 3
+        if self._fmt == MONO_HLSB:
+            return (self._buf[index] >> (7 - (x & 7))) & 1
+        return (self._buf[index] >> (x & 7)) & 1
+
+    def _set(self, x, y, c):
+        if self._fmt == MONO_VLSB:
+            index = (y >> 3) * self._stride + x
+            bit = 1 << (y & 7)
+        else:
+            index = (x + y * self._stride) >> 3
+            bit = 1 << ((7 - (x & 7)) if self._fmt == MONO_HLSB else (x & 7))
+        if c & 1:
+            self._buf[index] |= bit
+        else:
+            self._buf[index] &= ~bit & 0xFF
+
+    def _fill_rect(self, x, y, w, h, c):
+        if h < 1 or w < 1 or x + w <= 0 or y + h <= 0 or y >= self._h or x >= self._w:
+            return
+        xend = min(self._w, x + w)
+        yend = min(self._h, y + h)
+        x = max(x, 0)
+        y = max(y, 0)
+        for yy in range(y, yend):
+            for xx in range(x, xend):
+                self._set(xx, yy, c)
+
+    def fill(self, c):
+        if self._stride == self._w and len(self._buf) * 8 == self._w * self._h:
+            value = 0xFF if c & 1 else 0
+            for i in range(len(self._buf)):
+                self._buf[i] = value
+        else:
+            self._fill_rect(0, 0, self._w, self._h, c)
+
+    def pixel(self, x, y, c=None):
+        if 0 <= x < self._w and 0 <= y < self._h:
+            if c is None:
+                return self._get(x, y)
+            self._set(x, y, c)
+        return None
+
+    def hline(self, x, y, w, c):
+        self._fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self._fill_rect(x, y, 1, h, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        self._fill_rect(x, y, w, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self._fill_rect(x, y, w, h, c)
+        else:
+            self._fill_rect(x, y, w, 1, c)
+            self._fill_rect(x, y + h - 1, w, 1, c)
+            self._fill_rect(x, y, 1, h, c)
+            self._fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        dx = x2 - x1
+        sx = 1 if dx > 0 else -1
+        dx = abs(dx)
+        dy = y2 - y1
+        sy = 1 if dy > 0 else -1
+        dy = abs(dy)
+        steep = dy > dx
+        if steep:
+            x1, y1 = y1, x1
+            dx, dy = dy, dx
+            sx, sy = sy, sx
+        e = 2 * dy - dx
+        for _ in range(dx):
+            if steep:
+                self.pixel(y1, x1, c)
+            else:
+                self.pixel(x1, y1, c)
+            while e >= 0:
+                y1 += sy
+                e -= 2 * dx
+            x1 += sx
+            e += 2 * dy
+        self.pixel(x2, y2, c)
+
+    def _draw_ellipse_points(self, cx, cy, x, y, c, f, m):
+        if f:
+            if m & 0x1:
+                self._fill_rect(cx, cy - y, x + 1, 1, c)
+            if m & 0x2:
+                self._fill_rect(cx - x, cy - y, x + 1, 1, c)
+            if m & 0x4:
+                self._fill_rect(cx - x, cy + y, x + 1, 1, c)
+            if m & 0x8:
+                self._fill_rect(cx, cy + y, x + 1, 1, c)
+        else:
+            if m & 0x1:
+                self.pixel(cx + x, cy - y, c)
+            if m & 0x2:
+                self.pixel(cx - x, cy - y, c)
+            if m & 0x4:
+                self.pixel(cx - x, cy + y, c)
+            if m & 0x8:
+                self.pixel(cx + x, cy + y, c)
+
+    def ellipse(self, cx, cy, xr, yr, c, f=False, m=0xF):
+        m = m & 0xF
+        if xr == 0 and yr == 0:
+            if m:
+                self.pixel(cx, cy, c)
+            return
+        two_asquare = 2 * xr * xr
+        two_bsquare = 2 * yr * yr
+        x = xr
+        y = 0
+        xchange = yr * yr * (1 - 2 * xr)
+        ychange = xr * xr
+        ellipse_error = 0
+        stoppingx = two_bsquare * xr
+        stoppingy = 0
+        while stoppingx >= stoppingy:
+            self._draw_ellipse_points(cx, cy, x, y, c, f, m)
+            y += 1
+            stoppingy += two_asquare
+            ellipse_error += ychange
+            ychange += two_asquare
+            if 2 * ellipse_error + xchange > 0:
+                x -= 1
+                stoppingx -= two_bsquare
+                ellipse_error += xchange
+                xchange += two_bsquare
+        x = 0
+        y = yr
+        xchange = yr * yr
+        ychange = xr * xr * (1 - 2 * yr)
+        ellipse_error = 0
+        stoppingx = 0
+        stoppingy = two_asquare * yr
+        while stoppingx <= stoppingy:
+            self._draw_ellipse_points(cx, cy, x, y, c, f, m)
+            x += 1
+            stoppingx += two_bsquare
+            ellipse_error += xchange
+            xchange += two_bsquare
+            if 2 * ellipse_error + ychange > 0:
+                y -= 1
+                stoppingy -= two_asquare
+                ellipse_error += ychange
+                ychange += two_asquare
+
+    def poly(self, x, y, coords, c, f=False):
+        n = len(coords) // 2
+        if n < 1:
+            return
+        points = [(coords[2 * i] + x, coords[2 * i + 1] + y) for i in range(n)]
+        if f:
+            ymin = min(p[1] for p in points)
+            ymax = max(p[1] for p in points)
+            for row in range(ymin, ymax + 1):
+                nodes = []
+                for i in range(n):
+                    (px1, py1), (px2, py2) = points[i], points[i - 1]
+                    if (py1 <= row < py2) or (py2 <= row < py1):
+                        nodes.append(px1 + (row - py1) * (px2 - px1) // (py2 - py1))
+                nodes.sort()
+                for i in range(0, len(nodes) - 1, 2):
+                    self._fill_rect(nodes[i], row, nodes[i + 1] - nodes[i] + 1, 1, c)
+        for i in range(n):
+            (px1, py1), (px2, py2) = points[i - 1], points[i]
+            self.line(px1, py1, px2, py2, c)
+
+    def text(self, s, x0, y0, c=1):
+        for ch in s:
+            if x0 >= self._w:
+                break
+            glyph = _glyph(ch)
+            for i in range(8):
+                column = glyph[i]
+                xx = x0 + i
+                if 0 <= xx < self._w:
+                    for j in range(8):
+                        if column >> j & 1:
+                            yy = y0 + j
+                            if 0 <= yy < self._h:
+                                self._set(xx, yy, c)
+            x0 += 8
+
+    def large_text(self, s, x, y, m, c=1, r=0, t=None):
+        # as framebuf2 (not part of framebuf, see host.extended_sh1107()):
+        # each character scaled by m, drawn with a fill_rect() per pixel in a
+        # cell of 8m x 8m pixels, the cells from (x, y) along x for a text
+        # rotation r of 0 or 180 degrees and along y for 90 or 270, and each
+        # character turned clockwise by t degrees (by r if t is None)
+        r = r % 360 // 90
+        t = r if t is None else t % 360 // 90
+        for ch in s:
+            glyph = _glyph(ch)
+            for i in range(8):
+                for j in range(8):
+                    if glyph[i] >> j & 1:
+                        (u, v) = ((i, j), (7 - j, i), (7 - i, 7 - j), (j, 7 - i))[t]
+                        self.fill_rect(x + u * m, y + v * m, m, m, c)
+            if r in (0, 2):
+                x += 8 * m
+            else:
+                y += 8 * m
+
+    def scroll(self, xstep, ystep):
+        if xstep < 0:
+            sx, xend, dx = 0, self._w + xstep, 1
+            if xend <= 0:
+                return
+        else:
+            sx, xend, dx = self._w - 1, xstep - 1, -1
+            if xend >= self._w:
+                return
+        if ystep < 0:
+            y, yend, dy = 0, self._h + ystep, 1
+            if yend <= 0:
+                return
+        else:
+            y, yend, dy = self._h - 1, ystep - 1, -1
+            if yend >= self._h:
+                return
+        while y != yend:
+            x = sx
+            while x != xend:
+                if 0 <= x - xstep < self._w and 0 <= y - ystep < self._h:
+                    self._set(x, y, self._get(x - xstep, y - ystep))
+                x += dx
+            y += dy
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if isinstance(fbuf, tuple):
+            fbuf = FrameBuffer(*fbuf)
+        for j in range(fbuf._h):
+            yy = y + j
+            if not 0 <= yy < self._h:
+                continue
+            for i in range(fbuf._w):
+                xx = x + i
+                if not 0 <= xx < self._w:
+                    continue
+                col = fbuf._get(i, j)
+                if palette is not None:
+                    col = palette.pixel(col, 0)
+                if col != key:
+                    self._set(xx, yy, col)
@@ -0,0 +1,267 @@
+# Runs the SH1107 driver under CPython with recording buses, so that the
+# transactions and bytes sent by show() can be counted off-device (eg in CI)
+#
+# usage:
+#   python tools/host.py            report transactions and bytes per show()
+#                                   for every rotation and display size
+#
+#   import host      (also makes sh1107 importable)
+#   display = host.recording_display("i2c", 128, 128, rotate=90)
+#   display.text("SH1107", 0, 0, 1)
+#   display.transport.reset()
+#   display.show()
+#   print(display.transport.summary())
+#
+#   extended = host.extended_sh1107()   (sh1107.py as loaded with framebuf2)
+#   display = host.recording_display("i2c", 128, 128, driver=extended)
+
+import os
+import sys
+import time
+from collections import namedtuple
+
+_TOOLS = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_TOOLS)
+
+# one bus transaction: time in microseconds since the bus was made, "i2c" or
+# "spi", the control bytes (I2C) or D/C levels (SPI) in order, the display
+# data and command bytes without them, and the number of bytes on the wire
+# after the I2C address
+Transaction = namedtuple("Transaction", "time_us bus control payload nbytes")
+
+
+def install():
+    # makes micropython, framebuf and the time functions used by the driver
+    # available under CPython and puts sh1107.py on the module path
+    if not hasattr(time, "sleep_ms"):
+        time.sleep_ms = lambda ms: None
+        time.sleep_us = lambda us: None
+        time.ticks_ms = lambda: time.perf_counter_ns() // 1000000
+        time.ticks_us = lambda: time.perf_counter_ns() // 1000
+        time.ticks_diff = lambda a, b: a - b
+        time.ticks_add = lambda a, b: a + b
+    for path in (_TOOLS, _ROOT):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+class RecordingPin:
+    # stands in for machine.Pin, counting level changes
+    OUT = 1
+
+    def __init__(self, value=0):
+        self.level = value
+        self.toggles = 0
+
+    def init(self, mode=None, value=None):
+        if value is not None:
+            self.level = value
+
+    def __call__(self, value=None):
+        if value is None:
+            return self.level
+        if value != self.level:
+            self.toggles += 1
+        self.level = value
+
+    value = __call__
+
+
+class RecordingI2C:
+    # stands in for machine.I2C, logging each transaction; listener, if
+    # given, is called with (is_data, bytes) for every command or data run
+    def __init__(self, listener=None):
+        self.transactions = []
+        self.listener = listener
+        self._t0 = time.perf_counter_ns()
+
+    def writeto(self, address, buf, stop=True):
+        self._record(bytes(buf))
+
+    def writevto(self, address, vector, stop=True):
+        self._record(b"".join(bytes(b) for b in vector))
+
+    def _record(self, buf):
+        control = bytearray()
+        payload = bytearray()
+        i = 0
+        while i < len(buf):
+            # a control byte with Co set is followed by a single byte and
+            # another control byte, otherwise by the rest of the transaction
+            c = buf[i]
+            control.append(c)
+            run = buf[i + 1 : i + 2] if c & 0x80 else buf[i + 1 :]
+            payload += run
+            if self.listener is not None:
+                self.listener(bool(c & 0x40), run)
+            i += 1 + len(run)
+        self.transactions.append(Transaction(
+            (time.perf_counter_ns() - self._t0) // 1000, "i2c",
+            bytes(control), bytes(payload), len(buf)))
+
+
+class RecordingSPI:
+    # stands in for machine.SPI, logging each write with the D/C level
+    def __init__(self, listener=None):
+        self.transactions = []
+        self.listener = listener
+        self.dc = RecordingPin(0)
+        self.cs = RecordingPin(1)
+        self._t0 = time.perf_counter_ns()
+
+    def write(self, buf):
+        buf = bytes(buf)
+        if self.cs.level:
+            raise RuntimeError("SPI write with CS not asserted")
+        dc = self.dc.level
+        if self.listener is not None:
+            self.listener(bool(dc), buf)
+        self.transactions.append(Transaction(
+            (time.perf_counter_ns() - self._t0) // 1000, "spi",
+            bytes((dc,)), buf, len(buf)))
+
+
+install()
+import sh1107
+
+
+class RecordingTransport(sh1107.Transport):
+    """
+    a transport that sends through the driver's own I2C or SPI transport
+    to a recording bus, so that everything the driver would put on the
+    wire is logged in transactions
+    """
+    def __init__(self, bus="i2c", listener=None, **kwargs):
+        super().__init__()
+        if bus == "i2c":
+            self.bus = RecordingI2C(listener)
+            self.inner = sh1107.I2CTransport(self.bus, **kwargs)
+        elif bus == "spi":
+            self.bus = RecordingSPI(listener)
+            self.inner = sh1107.SPITransport(self.bus, self.bus.dc,
+                                             self.bus.cs, **kwargs)
+        else:
+            raise ValueError("bus must be 'i2c' or 'spi'")
+        self.segment_cost = self.inner.segment_cost
+        self.block_transactions = self.inner.block_transactions
+
+    @property
+    def transactions(self):
+        return self.bus.transactions
+
+    def write_command(self, buf):
+        self.inner.write_command(buf)
+
+    def write_data(self, buf):
+        self.inner.write_data(buf)
+
+    def write_block(self, page, column, buf):
+        self.inner.write_block(page, column, buf)
+
+    def begin(self):
+        self.inner.begin()
+
+    def end(self):
+        self.inner.end()
+
+    def reset(self):
+        # clears the log, eg after the display has been initialised
+        del self.bus.transactions[:]
+
+    def summary(self):
+        # (transactions, bytes on the wire, display data bytes)
+        log = self.bus.transactions
+        data = 0
+        for t in log:
+            if t.bus == "spi":
+                data += len(t.payload) if t.control[0] else 0
+            else:
+                data += _i2c_data_bytes(t)
+        return (len(log), sum(t.nbytes for t in log), data)
+
+
+def _i2c_data_bytes(t):
+    # display data bytes in an I2C transaction: those after a control
+    # byte with D/C set
+    n = 0
+    i = 0
+    for c in t.control:
+        if c & 0x80:
+            n += 1 if c & 0x40 else 0
+            i += 1
+        else:
+            n += len(t.payload) - i if c & 0x40 else 0
+    return n
+
+
+def extended_sh1107():
+    # a second copy of the sh1107 module, loaded with the framebuf stand-in
+    # (which has the large_text() of framebuf2) as framebuf2, so that the
+    # framebuf2 code of the driver, such as the glyph cache, can be run
+    global _extended
+    if _extended is None:
+        import importlib.util
+        import framebuf
+        sys.modules["framebuf2"] = framebuf
+        try:
+            spec = importlib.util.spec_from_file_location("sh1107_framebuf2",
+                                                          sh1107.__file__)
+            _extended = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(_extended)
+        finally:
+            del sys.modules["framebuf2"]
+    return _extended
+
+_extended = None
+
+
+def recording_display(bus, width, height, rotate=0, listener=None, driver=None,
+                      **kwargs):
+    # an SH1107 display with a RecordingTransport, made by the driver module
+    # (sh1107 or extended_sh1107()); kwargs are passed to the transport (eg
+    # combined, burst) or to SH1107 (eg warm_start)
+    transport_args = {k: kwargs.pop(k) for k in ("combined", "burst", "address")
+                      if k in kwargs}
+    transport = RecordingTransport(bus, listener, **transport_args)
+    return (driver or sh1107).SH1107(width, height, False, rotate=rotate,
+                                     transport=transport, **kwargs)
+
+
+def _measure(display, draw, full_update=False):
+    display.transport.reset()
+    draw(display)
+    display.show(full_update)
+    return display.transport.summary()
+
+
+_SCENARIOS = (
+    ("full", lambda d: None, True),
+    ("text", lambda d: d.text("SH1107", 8, 16, 1), False),
+    ("pixel", lambda d: d.pixel(d.width // 2, d.height // 2, 1), False),
+    ("hline", lambda d: d.hline(0, d.height // 2 + 3, d.width, 1), False),
+    ("vline", lambda d: d.vline(d.width // 2 + 3, 0, d.height, 1), False),
+)
+
+
+def report(out=sys.stdout):
+    # transactions / bytes on the wire per show() for each bus, size,
+    # rotation and drawing operation
+    out.write("%-9s %-4s %-3s" % ("size", "bus", "rot"))
+    for name, draw, full in _SCENARIOS:
+        out.write(" %14s" % name)
+    out.write("\n")
+    for (width, height) in ((128, 128), (128, 64)):
+        for bus in ("i2c", "spi"):
+            for rotate in (0, 90, 180, 270):
+                display = recording_display(bus, width, height, rotate)
+                out.write("%-9s %-4s %-3d" % ("%dx%d" % (width, height), bus, rotate))
+                for name, draw, full in _SCENARIOS:
+                    display.fill(0)
+                    display.show()
+                    (n, nbytes, data) = _measure(display, draw, full)
+                    out.write(" %14s" % ("%d / %d" % (n, nbytes)))
+                out.write("\n")
+
+
+if __name__ == "__main__":
+    report()
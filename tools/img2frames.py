@@ -0,0 +1,151 @@
+# Converts images (PNG, GIF, or an animated GIF) into the frame files played
+# by sh1107_player.Player
+#
+# The frames are packed in the layout of the display's framebuffer for the
+# rotation given, MONO_VLSB for 90 or 270 degrees or MONO_HMSB for 0 or 180
+# degrees, so that the player sends them without converting them. After the
+# first frame each frame is stored as a delta frame, holding only the
+# changed span of each changed page, unless the whole frame is smaller.
+# Images are scaled to the size of the display's framebuffer (for a 128x64
+# display, 128x64 at 0 or 180 degrees and 64x128 at 90 or 270) and made
+# black and white by dithering, or with --threshold by a threshold. Reading
+# images needs Pillow (pip install pillow).
+#
+# usage:
+#   python tools/img2frames.py out.frm image1.png [image2.png ...]
+#                              [--size 128x128] [--rotate 90] [--delay 100]
+#                              [--threshold 128]
+#
+# --delay sets the time each frame is shown in milliseconds, for images
+# without a duration of their own (animated GIFs have one per frame)
+
+import sys
+
+_MARKER = 0x67
+_KEY_FRAME = 0xFF
+VLSB = 0
+HMSB = 1
+
+
+def geometry(size, rotate):
+    # the framebuffer width, height and layout of a display of size
+    # (width, height) as given to the driver, used at rotate degrees
+    (width, height) = size
+    if rotate in (90, 270):
+        return height, width, VLSB
+    return width, height, HMSB
+
+
+def pack(pixels, width, height, layout):
+    # a framebuffer of the rows of pixels (each a sequence of 0 and 1)
+    if layout == VLSB:
+        buf = bytearray(width * ((height + 7) // 8))
+        for (y, row) in enumerate(pixels):
+            for (x, p) in enumerate(row):
+                if p:
+                    buf[(y >> 3) * width + x] |= 1 << (y & 7)
+    else:
+        row_bytes = (width + 7) // 8
+        buf = bytearray(height * row_bytes)
+        for (y, row) in enumerate(pixels):
+            for (x, p) in enumerate(row):
+                if p:
+                    buf[y * row_bytes + (x >> 3)] |= 1 << (x & 7)
+    return buf
+
+
+def pages(buf, width, height, layout):
+    # the pages of a framebuffer, each as a list of its lines of bytes
+    # (one line in MONO_VLSB, 8 rows in MONO_HMSB)
+    if layout == VLSB:
+        return [[buf[p * width:(p + 1) * width]] for p in range(height // 8)]
+    row_bytes = width // 8
+    return [[buf[y * row_bytes:(y + 1) * row_bytes] for y in range(8 * p, 8 * p + 8)]
+            for p in range(height // 8)]
+
+
+def delta(previous, frame, width, height, layout):
+    # the changed span of each changed page as (page, first, last, data)
+    spans = []
+    for (page, (old, new)) in enumerate(zip(pages(previous, width, height, layout),
+                                            pages(frame, width, height, layout))):
+        changed = [c for c in range(len(new[0])) if any(o[c] != n[c] for (o, n) in zip(old, new))]
+        if changed:
+            (first, last) = (changed[0], changed[-1])
+            spans.append((page, first, last, b"".join(bytes(n[first:last + 1]) for n in new)))
+    return spans
+
+
+def encode(frames, width, height, layout):
+    # the frame file for frames given as (framebuffer, delay in milliseconds)
+    if not (0 < width < 256 and 0 < height < 256) or height % 8 or width % 8:
+        raise ValueError("framebuffer size %dx%d not supported" % (width, height))
+    if len(frames) > 0xFFFF:
+        raise ValueError("too many frames")
+    out = bytearray((_MARKER, layout, width, height, len(frames) & 0xFF, len(frames) >> 8))
+    previous = None
+    for (frame, delay) in frames:
+        delay = min(max(int(delay), 0), 0xFFFF)
+        key = bytes((_KEY_FRAME, delay & 0xFF, delay >> 8)) + bytes(frame)
+        if previous is not None:
+            spans = delta(previous, frame, width, height, layout)
+            data = bytearray((len(spans), delay & 0xFF, delay >> 8))
+            for (page, first, last, span) in spans:
+                data += bytes((page, first, last)) + span
+            if len(data) < len(key):
+                key = data
+        out += key
+        previous = frame
+    return out
+
+
+def read_images(paths, width, height, delay=100, threshold=None):
+    # the frames of the image files as (rows of pixels, delay), each image
+    # (or each frame of an animation) scaled to width x height
+    from PIL import Image, ImageSequence
+    frames = []
+    for path in paths:
+        with Image.open(path) as image:
+            for frame in ImageSequence.Iterator(image):
+                duration = frame.info.get("duration") or delay
+                frame = frame.convert("L")
+                if frame.size != (width, height):
+                    frame = frame.resize((width, height))
+                if threshold is None:
+                    frame = frame.convert("1")
+                else:
+                    frame = frame.point(lambda v: 255 if v >= threshold else 0).convert("1")
+                data = list(frame.getdata())
+                frames.append(([[1 if data[y * width + x] else 0 for x in range(width)]
+                                for y in range(height)], duration))
+    return frames
+
+
+def _main(argv):
+    args = {}
+    paths = []
+    i = 0
+    while i < len(argv):
+        if argv[i].startswith("--"):
+            args[argv[i]] = argv[i + 1]
+            i += 2
+        else:
+            paths.append(argv[i])
+            i += 1
+    (output, images) = (paths[0], paths[1:])
+    size = tuple(int(v) for v in args.get("--size", "128x128").split("x"))
+    rotate = int(args.get("--rotate", 0))
+    (width, height, layout) = geometry(size, rotate)
+    threshold = args.get("--threshold")
+    frames = [(pack(pixels, width, height, layout), duration)
+              for (pixels, duration) in read_images(
+                  images, width, height, int(args.get("--delay", 100)),
+                  None if threshold is None else int(threshold))]
+    data = encode(frames, width, height, layout)
+    with open(output, "wb") as out:
+        out.write(data)
+    print("%s: %d frames, %d bytes" % (output, len(frames), len(data)))
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
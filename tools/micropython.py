@@ -0,0 +1,5 @@
+# CPython stand-in for the MicroPython micropython module, for running
+# sh1107.py off-device (see host.py)
+
+def const(value):
+    return value